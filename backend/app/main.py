@@ -1,12 +1,48 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.routers import sessions, files, chat
+from app.services import database as db
+from app.services.modal_client import DEFAULT_ACCOUNT_ID, init_modal_client, prewarm_sandboxes
+
+# Number of most recently active sessions whose sandboxes are warmed at startup
+PREWARM_RECENT_SESSIONS = int(os.environ.get("PREWARM_RECENT_SESSIONS", "1"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create/migrate the schema once per worker process at startup
+    db.init_db()
+    timestamp_writer = asyncio.create_task(db.timestamp_writer())
+    modal_init = asyncio.create_task(init_modal_client())
+
+    # Warm sandboxes for the latest sessions without delaying startup
+    prewarm_task = None
+    if PREWARM_RECENT_SESSIONS > 0:
+        recent = await asyncio.to_thread(db.list_sessions, DEFAULT_ACCOUNT_ID, PREWARM_RECENT_SESSIONS)
+        session_ids = [session.id for session in recent]
+        if session_ids:
+            prewarm_task = asyncio.create_task(prewarm_sandboxes(session_ids))
+    yield
+    modal_init.cancel()
+    if prewarm_task:
+        prewarm_task.cancel()
+    timestamp_writer.cancel()
+    try:
+        await timestamp_writer
+    except asyncio.CancelledError:
+        pass
+
 
 app = FastAPI(
     title="Claude Agent API",
     description="Backend API for Claude Agent SDK + Modal sandbox template",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS for local development
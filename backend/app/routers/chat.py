@@ -1,15 +1,39 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from datetime import datetime, timezone
 import asyncio
-import json
 import traceback
 
+import orjson
+
 from app.services import database as db
 from app.services.modal_client import call_agent_streaming, interrupt_agent
 
 router = APIRouter(tags=["chat"])
 
 
+async def send_json(websocket: WebSocket, payload: dict):
+    """Send a JSON payload as a binary frame of orjson bytes (no str round-trip)."""
+    await websocket.send_bytes(orjson.dumps(payload))
+
+
+def iter_event_lines(event_chunk: str):
+    """Yield the non-empty lines of a chunk streamed from the Modal agent.
+
+    Every chunk from run_agent_streaming holds one or more complete JSON records,
+    and almost always exactly one, so that case is yielded without splitting.
+    """
+    if "\n" not in event_chunk:
+        event_str = event_chunk.strip()
+        if event_str:
+            yield event_str
+        return
+
+    for event_str in event_chunk.split("\n"):
+        event_str = event_str.strip()
+        if event_str:
+            yield event_str
+
+
 @router.websocket("/api/sessions/{session_id}/chat")
 async def chat_websocket(websocket: WebSocket, session_id: str):
     """WebSocket endpoint for chat messages with streaming responses.
@@ -21,7 +45,7 @@ async def chat_websocket(websocket: WebSocket, session_id: str):
     - {"message": "..."} - Send a chat message
     - {"type": "stop"} - Stop the current generation
     """
-    session = db.get_session(session_id)
+    session = await asyncio.to_thread(db.get_session, session_id)
     if not session:
         await websocket.close(code=4004, reason="Session not found")
         return
@@ -41,7 +65,7 @@ async def chat_websocket(websocket: WebSocket, session_id: str):
         try:
             while True:
                 data = await websocket.receive_text()
-                message_data = json.loads(data)
+                message_data = orjson.loads(data)
 
                 # Handle stop request immediately
                 if message_data.get("type") == "stop":
@@ -50,7 +74,7 @@ async def chat_websocket(websocket: WebSocket, session_id: str):
                         result = await interrupt_agent(session_id)
                         print(f"Interrupt result: {result}")
                         was_interrupted = True
-                        await websocket.send_json({
+                        await send_json(websocket, {
                             "type": "stream",
                             "event": {"type": "stop_acknowledged", "result": result},
                             "timestamp": datetime.now(timezone.utc).isoformat(),
@@ -87,8 +111,8 @@ async def chat_websocket(websocket: WebSocket, session_id: str):
                 # Look up file names from database
                 referenced_files = []
                 for file_id in file_ids:
-                    file_info = db.get_file(file_id)
-                    if file_info and file_info.get("session_id") == session_id:
+                    file_info = await asyncio.to_thread(db.get_file, file_id)
+                    if file_info and file_info.session_id == session_id:
                         referenced_files.append(file_info)
 
                 if referenced_files:
@@ -96,7 +120,7 @@ async def chat_websocket(websocket: WebSocket, session_id: str):
                     file_context_lines = ["[REFERENCED FILES]"]
                     file_context_lines.append("The user has specifically referenced these files. Read them directly without listing first:")
                     for f in referenced_files:
-                        file_context_lines.append(f"- /data/{f['name']}")
+                        file_context_lines.append(f"- /data/{f.name}")
                     file_context_lines.append("[END REFERENCED FILES]")
                     file_context_lines.append("")
 
@@ -108,7 +132,8 @@ async def chat_websocket(websocket: WebSocket, session_id: str):
             was_interrupted = False
 
             # Update session timestamp to keep it sorted by recent activity
-            db.update_session_timestamp(session_id)
+            # (queued and written in batches off the first-token path)
+            db.touch_session(session_id)
 
             try:
                 # Track response content for completion message
@@ -119,14 +144,13 @@ async def chat_websocket(websocket: WebSocket, session_id: str):
                     session_id=session_id,
                     user_message=user_message,
                 ):
-                    # Modal may yield multiple JSON lines in one chunk, split them
-                    for event_str in event_chunk.split('\n'):
-                        event_str = event_str.strip()
-                        if not event_str:
-                            continue
+                    # Lines in one chunk arrive together, so they share a timestamp
+                    chunk_timestamp = datetime.now(timezone.utc).isoformat()
 
+                    # Modal may yield multiple JSON lines in one chunk
+                    for event_str in iter_event_lines(event_chunk):
                         try:
-                            event = json.loads(event_str)
+                            event = orjson.loads(event_str)
                             event_type = event.get("type")
 
                             # Check if this is an interruption event from the agent
@@ -134,10 +158,10 @@ async def chat_websocket(websocket: WebSocket, session_id: str):
                                 was_interrupted = True
 
                             # Send streaming event to client
-                            await websocket.send_json({
+                            await send_json(websocket, {
                                 "type": "stream",
                                 "event": event,
-                                "timestamp": datetime.now(timezone.utc).isoformat(),
+                                "timestamp": chunk_timestamp,
                             })
 
                             # Track text for completion message
@@ -146,14 +170,14 @@ async def chat_websocket(websocket: WebSocket, session_id: str):
                                 if content:
                                     all_text_content.append(content)
 
-                        except json.JSONDecodeError:
+                        except orjson.JSONDecodeError:
                             # Non-JSON output, send as text
                             if not event_str.startswith('{') and not event_str.startswith('['):
                                 all_text_content.append(event_str)
-                                await websocket.send_json({
+                                await send_json(websocket, {
                                     "type": "stream",
                                     "event": {"type": "text", "content": event_str},
-                                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                                    "timestamp": chunk_timestamp,
                                 })
 
                 if was_interrupted:
@@ -165,14 +189,14 @@ async def chat_websocket(websocket: WebSocket, session_id: str):
                 print(f"Error calling Modal agent: {e}")
                 traceback.print_exc()
                 response_content = f"Error: {str(e)}"
-                await websocket.send_json({
+                await send_json(websocket, {
                     "type": "stream",
                     "event": {"type": "error", "message": str(e)},
                     "timestamp": datetime.now(timezone.utc).isoformat(),
                 })
 
             # Send completion message to client
-            await websocket.send_json({
+            await send_json(websocket, {
                 "type": "complete",
                 "role": "assistant",
                 "content": response_content,
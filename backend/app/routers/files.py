@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File
-from fastapi.responses import Response
-from datetime import datetime
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+import asyncio
 import uuid
 import traceback
 import base64
@@ -8,56 +9,50 @@ import base64
 from app.models.schemas import FileInfo, FileListResponse
 from app.services import database as db
 from app.services.modal_client import (
-    save_file_to_modal,
+    upload_files_to_modal,
     delete_file_from_modal,
-    get_file_content_from_modal,
+    stream_file_from_modal,
     invalidate_and_warm_sandbox,
 )
 
 router = APIRouter(prefix="/api/sessions/{session_id}/files", tags=["files"])
 
+# Validates whole lists of DB rows at once; pydantic parses the ISO timestamps
+_file_list_adapter = TypeAdapter(list[FileInfo])
+
 
 @router.post("", response_model=list[FileInfo])
 async def upload_files(session_id: str, files: list[UploadFile] = File(...)):
     """Upload files to a session."""
-    session = db.get_session(session_id)
+    session = await asyncio.to_thread(db.get_session, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    uploaded = []
-    for file in files:
-        file_id = str(uuid.uuid4())
-        content = await file.read()
-
-        try:
-            # Upload to Modal volume (just saves file, no sandbox operations)
-            modal_result = await save_file_to_modal(
-                session_id=session_id,
-                filename=file.filename,
-                content=content,
-            )
-            print(f"Uploaded to Modal: {modal_result}")
-        except Exception as e:
-            print(f"Error uploading to Modal: {e}")
-            traceback.print_exc()
-            raise HTTPException(status_code=500, detail=f"Failed to upload file: {str(e)}")
-
-        # Save to database
-        file_record = db.add_file(
-            file_id=file_id,
+    # Stream the (already spooled) upload bodies straight into the Modal volume
+    # instead of reading each one fully into memory first
+    try:
+        modal_result = await upload_files_to_modal(
             session_id=session_id,
-            name=file.filename,
-            file_type=file.content_type or "application/octet-stream",
-            size=len(content),
+            files=[(file.filename, file.file) for file in files],
+        )
+        print(f"Uploaded to Modal: {modal_result}")
+    except Exception as e:
+        print(f"Error uploading to Modal: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Failed to upload file: {str(e)}")
+
+    # Save all file records in a single transaction
+    file_records = await asyncio.to_thread(db.add_files_bulk, session_id, [
+        (
+            str(uuid.uuid4()),
+            file.filename,
+            file.content_type or "application/octet-stream",
+            file.size,
         )
+        for file in files
+    ])
 
-        uploaded.append(FileInfo(
-            id=file_record["id"],
-            name=file_record["name"],
-            type=file_record["type"],
-            size=file_record["size"],
-            uploaded_at=datetime.fromisoformat(file_record["uploaded_at"]),
-        ))
+    uploaded = _file_list_adapter.validate_python(file_records)
 
     # After all files are uploaded, invalidate sandbox once and warm up a fresh one
     try:
@@ -71,44 +66,34 @@ async def upload_files(session_id: str, files: list[UploadFile] = File(...)):
 @router.get("", response_model=FileListResponse)
 async def list_files(session_id: str):
     """List all files in a session."""
-    session = db.get_session(session_id)
+    session = await asyncio.to_thread(db.get_session, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    files = db.get_files(session_id)
-    file_infos = [
-        FileInfo(
-            id=f["id"],
-            name=f["name"],
-            type=f["type"],
-            size=f["size"],
-            uploaded_at=datetime.fromisoformat(f["uploaded_at"]),
-        )
-        for f in files
-    ]
-    return FileListResponse(files=file_infos)
+    files = await asyncio.to_thread(db.get_files, session_id)
+    return FileListResponse(files=_file_list_adapter.validate_python(files, from_attributes=True))
 
 
 @router.delete("/{file_id}")
 async def delete_file(session_id: str, file_id: str):
     """Delete a file from a session."""
-    session = db.get_session(session_id)
+    session = await asyncio.to_thread(db.get_session, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    file_record = db.get_file(file_id)
+    file_record = await asyncio.to_thread(db.get_file, file_id)
     if not file_record:
         raise HTTPException(status_code=404, detail="File not found")
 
     try:
         # Delete from Modal volume
-        await delete_file_from_modal(session_id, file_record["name"])
+        await delete_file_from_modal(session_id, file_record.name)
     except Exception as e:
         print(f"Error deleting from Modal: {e}")
         traceback.print_exc()
 
     # Delete from database
-    db.delete_file(file_id)
+    await asyncio.to_thread(db.delete_file, file_id)
 
     return {"status": "deleted"}
 
@@ -116,28 +101,34 @@ async def delete_file(session_id: str, file_id: str):
 @router.get("/{file_id}/content")
 async def get_file_content(session_id: str, file_id: str):
     """Get file content for preview."""
-    session = db.get_session(session_id)
+    session = await asyncio.to_thread(db.get_session, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    file_record = db.get_file(file_id)
+    file_record = await asyncio.to_thread(db.get_file, file_id)
     if not file_record:
         raise HTTPException(status_code=404, detail="File not found")
 
     try:
-        result = await get_file_content_from_modal(session_id, file_record["name"])
-
-        if result.get("error"):
-            raise HTTPException(status_code=404, detail=result["error"])
-
-        content = result["content"]
-        content_type = file_record["type"]
-
-        return Response(
-            content=content,
-            media_type=content_type,
+        # Pull the first chunk up front so a missing file is still a 404
+        chunks = stream_file_from_modal(session_id, file_record.name)
+        try:
+            first_chunk = await anext(chunks)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="File not found")
+        except StopAsyncIteration:
+            first_chunk = b""
+
+        async def body():
+            yield first_chunk
+            async for chunk in chunks:
+                yield chunk
+
+        return StreamingResponse(
+            body(),
+            media_type=file_record.type,
             headers={
-                "Content-Disposition": f'inline; filename="{file_record["name"]}"'
+                "Content-Disposition": f'inline; filename="{file_record.name}"'
             }
         )
     except HTTPException:
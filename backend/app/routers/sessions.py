@@ -1,5 +1,7 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
+from pydantic import TypeAdapter
 from datetime import datetime
+import asyncio
 import uuid
 
 from app.models.schemas import SessionResponse, SessionUpdateRequest
@@ -13,78 +15,71 @@ from app.services.modal_client import (
 
 router = APIRouter(prefix="/api/sessions", tags=["sessions"])
 
+# Validates whole lists of DB rows at once; pydantic parses the ISO timestamps
+_session_list_adapter = TypeAdapter(list[SessionResponse])
+
 
 @router.post("", response_model=SessionResponse)
 async def create_session(name: str = None):
     """Create a new session."""
     session_id = str(uuid.uuid4())
-    session = db.create_session(
+    session = await asyncio.to_thread(
+        db.create_session,
         session_id=session_id,
         account_id=DEFAULT_ACCOUNT_ID,
         name=name
     )
-    files = db.get_files(session_id)
+    # A freshly created session has no files yet
     return SessionResponse(
-        id=session["id"],
-        name=session["name"],
-        created_at=datetime.fromisoformat(session["created_at"]),
-        file_count=len(files),
+        id=session.id,
+        name=session.name,
+        created_at=datetime.fromisoformat(session.created_at),
+        file_count=0,
     )
 
 
 @router.get("", response_model=list[SessionResponse])
 async def list_sessions():
     """List all sessions for the demo account."""
-    sessions = db.list_sessions(DEFAULT_ACCOUNT_ID)
-    result = []
-    for session in sessions:
-        files = db.get_files(session["id"])
-        result.append(SessionResponse(
-            id=session["id"],
-            name=session["name"],
-            created_at=datetime.fromisoformat(session["created_at"]),
-            file_count=len(files),
-        ))
-    return result
+    sessions = await asyncio.to_thread(db.list_sessions_with_file_counts, DEFAULT_ACCOUNT_ID)
+    return _session_list_adapter.validate_python(sessions, from_attributes=True)
 
 
 @router.get("/{session_id}", response_model=SessionResponse)
 async def get_session(session_id: str):
     """Get session information."""
-    session = db.get_session(session_id)
+    session = await asyncio.to_thread(db.get_session_with_file_count, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    files = db.get_files(session_id)
     return SessionResponse(
-        id=session["id"],
-        name=session["name"],
-        created_at=datetime.fromisoformat(session["created_at"]),
-        file_count=len(files),
+        id=session.id,
+        name=session.name,
+        created_at=datetime.fromisoformat(session.created_at),
+        file_count=session.file_count,
     )
 
 
 @router.put("/{session_id}", response_model=SessionResponse)
 async def update_session(session_id: str, request: SessionUpdateRequest):
     """Update a session (rename)."""
-    session = db.get_session(session_id)
+    session = await asyncio.to_thread(db.get_session, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    updated_session = db.update_session_name(session_id, request.name)
-    files = db.get_files(session_id)
+    updated_session = await asyncio.to_thread(db.update_session_name, session_id, request.name)
     return SessionResponse(
-        id=updated_session["id"],
-        name=updated_session["name"],
-        created_at=datetime.fromisoformat(updated_session["created_at"]),
-        file_count=len(files),
+        id=updated_session.id,
+        name=updated_session.name,
+        created_at=datetime.fromisoformat(updated_session.created_at),
+        file_count=updated_session.file_count,
     )
 
 
 @router.get("/{session_id}/messages")
 async def get_session_messages(session_id: str):
     """Get all messages for a session from Claude SDK storage on Modal."""
-    session = db.get_session(session_id)
+    session = await asyncio.to_thread(db.get_session, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -100,7 +95,7 @@ async def get_session_messages(session_id: str):
 @router.delete("/{session_id}")
 async def delete_session(session_id: str):
     """Delete a session and its files."""
-    session = db.get_session(session_id)
+    session = await asyncio.to_thread(db.get_session, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -112,14 +107,14 @@ async def delete_session(session_id: str):
         print(f"Error cleaning up Modal session: {e}")
 
     # Delete from database
-    db.delete_session(session_id)
+    await asyncio.to_thread(db.delete_session, session_id)
     return {"status": "deleted"}
 
 
 @router.get("/{session_id}/sandbox-status")
 async def get_session_sandbox_status(session_id: str):
     """Get the sandbox status for a session directly from Modal."""
-    session = db.get_session(session_id)
+    session = await asyncio.to_thread(db.get_session, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -148,7 +143,7 @@ async def warm_up_sandbox(session_id: str, background_tasks: BackgroundTasks):
     This endpoint triggers sandbox creation in the background and returns immediately.
     The sandbox will be ready when the user sends their first message.
     """
-    session = db.get_session(session_id)
+    session = await asyncio.to_thread(db.get_session, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
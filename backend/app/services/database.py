@@ -1,6 +1,10 @@
 """SQLite database for session and chat persistence."""
 
+import asyncio
 import sqlite3
+import threading
+from collections import namedtuple
+from functools import lru_cache
 from datetime import datetime, timezone
 from pathlib import Path
 from contextlib import contextmanager
@@ -10,27 +14,111 @@ DB_PATH = Path(__file__).parent.parent.parent / "data" / "agent.db"
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 
+# Per-connection tuning. journal_mode=WAL is persistent and set once in init_db().
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+# Size of sqlite3's per-connection prepared statement cache (default is 128)
+CACHED_STATEMENTS = 256
+
+# One long-lived connection per thread (FastAPI runs sync work on a threadpool)
+_local = threading.local()
+
+
+@lru_cache(maxsize=None)
+def _row_type(columns: tuple[str, ...]) -> type:
+    # rename=True covers columns that aren't identifiers (e.g. "from" in PRAGMA output)
+    return namedtuple("Row", columns, rename=True)
+
+
+def _namedtuple_factory(cursor: sqlite3.Cursor, row: tuple):
+    """Row factory returning a namedtuple whose type is cached per column list."""
+    return _row_type(tuple(column[0] for column in cursor.description))._make(row)
+
+
 def get_connection():
     """Get a database connection."""
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
+    # Autocommit mode: multi-statement writes open their own transaction via transaction()
+    conn = sqlite3.connect(
+        str(DB_PATH),
+        isolation_level=None,
+        cached_statements=CACHED_STATEMENTS,
+    )
+    conn.row_factory = _namedtuple_factory
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
 @contextmanager
 def get_db():
-    """Context manager for database connections."""
-    conn = get_connection()
-    try:
-        yield conn
-        conn.commit()
-    finally:
-        conn.close()
+    """Context manager yielding this thread's connection, opened on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = get_connection()
+    yield conn
+
+
+@contextmanager
+def transaction(mode: str = "DEFERRED"):
+    """Context manager wrapping this thread's connection in BEGIN/COMMIT."""
+    with get_db() as conn:
+        conn.execute(f"BEGIN {mode}")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+# Tables owned by a session; rows go away with their session via ON DELETE CASCADE
+CHILD_TABLES = {
+    "messages": """
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            tool_calls TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES sessions(id) ON DELETE CASCADE
+        )
+    """,
+    "files": """
+        CREATE TABLE IF NOT EXISTS {name} (
+            id TEXT PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            type TEXT,
+            size INTEGER,
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES sessions(id) ON DELETE CASCADE
+        )
+    """,
+}
+
+
+_initialized = False
 
 
 def init_db():
-    """Initialize the database schema."""
+    """Initialize the database schema (once per process)."""
+    global _initialized
+    if _initialized:
+        return
+
     with get_db() as conn:
+        # WAL lets readers proceed while a writer commits; the mode persists in the file
+        conn.execute("PRAGMA journal_mode=WAL")
+
         conn.executescript("""
             CREATE TABLE IF NOT EXISTS sessions (
                 id TEXT PRIMARY KEY,
@@ -39,41 +127,47 @@ def init_db():
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
+        """)
+        for table, ddl in CHILD_TABLES.items():
+            conn.execute(ddl.format(name=table))
 
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT NOT NULL,
-                role TEXT NOT NULL,
-                content TEXT NOT NULL,
-                tool_calls TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (session_id) REFERENCES sessions(id)
-            );
+        # Migration: Add tool_calls column if it doesn't exist
+        cursor = conn.execute("PRAGMA table_info(messages)")
+        columns = [row.name for row in cursor.fetchall()]
+        if 'tool_calls' not in columns:
+            conn.execute("ALTER TABLE messages ADD COLUMN tool_calls TEXT")
 
-            CREATE TABLE IF NOT EXISTS files (
-                id TEXT PRIMARY KEY,
-                session_id TEXT NOT NULL,
-                name TEXT NOT NULL,
-                type TEXT,
-                size INTEGER,
-                uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (session_id) REFERENCES sessions(id)
-            );
+        # Migration: Rebuild child tables created before their FKs cascaded on delete
+        for table, ddl in CHILD_TABLES.items():
+            fks = conn.execute(f"PRAGMA foreign_key_list({table})").fetchall()
+            if all(fk.on_delete == "CASCADE" for fk in fks):
+                continue
+            columns = ", ".join(row.name for row in conn.execute(f"PRAGMA table_info({table})"))
+            with transaction("IMMEDIATE"):
+                conn.execute(ddl.format(name=f"{table}_new"))
+                conn.execute(
+                    f"INSERT INTO {table}_new ({columns}) SELECT {columns} FROM {table} "
+                    "WHERE session_id IN (SELECT id FROM sessions)"
+                )
+                conn.execute(f"DROP TABLE {table}")
+                conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
 
+        conn.executescript("""
             CREATE INDEX IF NOT EXISTS idx_messages_session_id ON messages(session_id);
             CREATE INDEX IF NOT EXISTS idx_files_session_id ON files(session_id);
             CREATE INDEX IF NOT EXISTS idx_sessions_account_id ON sessions(account_id);
+
+            -- Composite indexes matching the filter + ORDER BY of the list queries
+            CREATE INDEX IF NOT EXISTS idx_sessions_account_updated ON sessions(account_id, updated_at DESC);
+            CREATE INDEX IF NOT EXISTS idx_files_session_uploaded ON files(session_id, uploaded_at);
+            CREATE INDEX IF NOT EXISTS idx_messages_session_created ON messages(session_id, created_at);
         """)
 
-        # Migration: Add tool_calls column if it doesn't exist
-        cursor = conn.execute("PRAGMA table_info(messages)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'tool_calls' not in columns:
-            conn.execute("ALTER TABLE messages ADD COLUMN tool_calls TEXT")
+    _initialized = True
 
 
 # Session operations
-def create_session(session_id: str, account_id: str, name: str = None) -> dict:
+def create_session(session_id: str, account_id: str, name: str = None) -> tuple:
     """Create a new session."""
     with get_db() as conn:
         now = datetime.now(timezone.utc).isoformat()
@@ -84,52 +178,120 @@ def create_session(session_id: str, account_id: str, name: str = None) -> dict:
     return get_session(session_id)
 
 
-def get_session(session_id: str) -> dict | None:
+def get_session(session_id: str) -> tuple | None:
     """Get a session by ID."""
     with get_db() as conn:
         row = conn.execute(
-            "SELECT * FROM sessions WHERE id = ?",
+            "SELECT id, name, created_at, updated_at FROM sessions WHERE id = ?",
             (session_id,)
         ).fetchone()
-        if row:
-            return dict(row)
-    return None
+        return row
 
 
-def update_session_name(session_id: str, name: str) -> dict | None:
+def get_session_with_file_count(session_id: str) -> tuple | None:
+    """Get a session by ID along with its number of files."""
+    with get_db() as conn:
+        row = conn.execute(
+            """
+            SELECT s.id, s.name, s.created_at, s.updated_at,
+                   (SELECT COUNT(*) FROM files f WHERE f.session_id = s.id) AS file_count
+            FROM sessions s
+            WHERE s.id = ?
+            """,
+            (session_id,)
+        ).fetchone()
+        return row
+
+
+def update_session_name(session_id: str, name: str) -> tuple | None:
     """Update a session's name."""
     with get_db() as conn:
         conn.execute(
             "UPDATE sessions SET name = ?, updated_at = ? WHERE id = ?",
             (name, datetime.now(timezone.utc).isoformat(), session_id)
         )
-    return get_session(session_id)
+    return get_session_with_file_count(session_id)
+
+
+def list_sessions(account_id: str, limit: int | None = None) -> list[tuple]:
+    """List sessions for an account, most recently updated first (at most limit, if given)."""
+    with get_db() as conn:
+        if limit is None:
+            return conn.execute(
+                "SELECT id, name, created_at, updated_at FROM sessions WHERE account_id = ? ORDER BY updated_at DESC",
+                (account_id,)
+            ).fetchall()
+        return conn.execute(
+            "SELECT id, name, created_at, updated_at FROM sessions WHERE account_id = ? ORDER BY updated_at DESC LIMIT ?",
+            (account_id, limit)
+        ).fetchall()
 
 
-def list_sessions(account_id: str) -> list[dict]:
-    """List all sessions for an account."""
+def list_sessions_with_file_counts(account_id: str) -> list[tuple]:
+    """List all sessions for an account with their file counts in a single query."""
     with get_db() as conn:
         rows = conn.execute(
-            "SELECT * FROM sessions WHERE account_id = ? ORDER BY updated_at DESC",
+            """
+            SELECT s.id, s.name, s.created_at, s.updated_at, COALESCE(c.n, 0) AS file_count
+            FROM sessions s
+            LEFT JOIN (
+                SELECT session_id, COUNT(*) AS n FROM files GROUP BY session_id
+            ) c ON c.session_id = s.id
+            WHERE s.account_id = ?
+            ORDER BY s.updated_at DESC
+            """,
             (account_id,)
         ).fetchall()
-        return [dict(row) for row in rows]
+        return rows
 
 
-def update_session_timestamp(session_id: str):
-    """Update the session's updated_at timestamp."""
-    with get_db() as conn:
-        conn.execute(
+def update_session_timestamps(session_ids: set[str]):
+    """Update updated_at for several sessions in one transaction."""
+    now = datetime.now(timezone.utc).isoformat()
+    with transaction() as conn:
+        conn.executemany(
             "UPDATE sessions SET updated_at = ? WHERE id = ?",
-            (datetime.now(timezone.utc).isoformat(), session_id)
+            [(now, session_id) for session_id in session_ids]
         )
 
 
+# Sessions waiting for a coalesced updated_at write (see timestamp_writer)
+TIMESTAMP_FLUSH_INTERVAL = 0.2
+_pending_timestamps: asyncio.Queue[str] = asyncio.Queue()
+
+
+def touch_session(session_id: str):
+    """Queue a session's updated_at bump without waiting on the database."""
+    _pending_timestamps.put_nowait(session_id)
+
+
+def _drain_pending_timestamps(session_ids: set[str]) -> set[str]:
+    while not _pending_timestamps.empty():
+        session_ids.add(_pending_timestamps.get_nowait())
+    return session_ids
+
+
+async def timestamp_writer():
+    """Background task that batches queued timestamp bumps every TIMESTAMP_FLUSH_INTERVAL."""
+    session_ids: set[str] = set()
+    try:
+        while True:
+            session_ids.add(await _pending_timestamps.get())
+            await asyncio.sleep(TIMESTAMP_FLUSH_INTERVAL)
+            try:
+                await asyncio.to_thread(update_session_timestamps, _drain_pending_timestamps(session_ids))
+            except Exception as e:
+                print(f"Warning: Failed to update session timestamps: {e}")
+            session_ids = set()
+    finally:
+        # Flush whatever is still queued on shutdown
+        if _drain_pending_timestamps(session_ids):
+            update_session_timestamps(session_ids)
+
+
 def delete_session(session_id: str):
-    """Delete a session and all related data."""
-    with get_db() as conn:
-        conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
-        conn.execute("DELETE FROM files WHERE session_id = ?", (session_id,))
+    """Delete a session and all related data (messages and files cascade)."""
+    with transaction("IMMEDIATE") as conn:
         conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
 
 
@@ -147,7 +309,7 @@ def add_message(session_id: str, role: str, content: str, tool_calls: list | Non
 
     tool_calls_json = json.dumps(tool_calls) if tool_calls else None
 
-    with get_db() as conn:
+    with transaction() as conn:
         cursor = conn.execute(
             "INSERT INTO messages (session_id, role, content, tool_calls, created_at) VALUES (?, ?, ?, ?, ?)",
             (session_id, role, content, tool_calls_json, datetime.now(timezone.utc).isoformat())
@@ -166,34 +328,32 @@ def add_message(session_id: str, role: str, content: str, tool_calls: list | Non
         }
 
 
-def get_messages(session_id: str) -> list[dict]:
+def get_messages(session_id: str) -> list[tuple]:
     """Get all messages for a session."""
     import json
 
     with get_db() as conn:
         rows = conn.execute(
-            "SELECT * FROM messages WHERE session_id = ? ORDER BY created_at ASC",
+            "SELECT id, role, content, tool_calls, created_at FROM messages WHERE session_id = ? ORDER BY created_at ASC",
             (session_id,)
         ).fetchall()
         messages = []
         for row in rows:
-            msg = dict(row)
             # Parse tool_calls JSON if present
-            if msg.get('tool_calls'):
+            tool_calls = None
+            if row.tool_calls:
                 try:
-                    msg['tool_calls'] = json.loads(msg['tool_calls'])
+                    tool_calls = json.loads(row.tool_calls)
                 except json.JSONDecodeError:
-                    msg['tool_calls'] = None
-            else:
-                msg['tool_calls'] = None
-            messages.append(msg)
+                    pass
+            messages.append(row._replace(tool_calls=tool_calls))
         return messages
 
 
 # File operations
 def add_file(file_id: str, session_id: str, name: str, file_type: str, size: int) -> dict:
     """Add a file record to a session."""
-    with get_db() as conn:
+    with transaction() as conn:
         now = datetime.now(timezone.utc).isoformat()
         conn.execute(
             "INSERT INTO files (id, session_id, name, type, size, uploaded_at) VALUES (?, ?, ?, ?, ?, ?)",
@@ -214,14 +374,46 @@ def add_file(file_id: str, session_id: str, name: str, file_type: str, size: int
     }
 
 
-def get_files(session_id: str) -> list[dict]:
+def add_files_bulk(session_id: str, records: list[tuple[str, str, str, int]]) -> list[dict]:
+    """Add several file records to a session in one transaction.
+
+    Args:
+        session_id: The session ID
+        records: (file_id, name, file_type, size) tuples
+
+    All rows share a single upload timestamp, which also becomes the session's updated_at.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO files (id, session_id, name, type, size, uploaded_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(file_id, session_id, name, file_type, size, now) for file_id, name, file_type, size in records]
+        )
+        conn.execute(
+            "UPDATE sessions SET updated_at = ? WHERE id = ?",
+            (now, session_id)
+        )
+    return [
+        {
+            "id": file_id,
+            "session_id": session_id,
+            "name": name,
+            "type": file_type,
+            "size": size,
+            "uploaded_at": now,
+        }
+        for file_id, name, file_type, size in records
+    ]
+
+
+def get_files(session_id: str) -> list[tuple]:
     """Get all files for a session."""
     with get_db() as conn:
         rows = conn.execute(
-            "SELECT * FROM files WHERE session_id = ? ORDER BY uploaded_at ASC",
+            "SELECT id, name, type, size, uploaded_at FROM files WHERE session_id = ? ORDER BY uploaded_at ASC",
             (session_id,)
         ).fetchall()
-        return [dict(row) for row in rows]
+        return rows
 
 
 def delete_file(file_id: str):
@@ -230,17 +422,12 @@ def delete_file(file_id: str):
         conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
 
 
-def get_file(file_id: str) -> dict | None:
+def get_file(file_id: str) -> tuple | None:
     """Get a file by ID."""
     with get_db() as conn:
         row = conn.execute(
-            "SELECT * FROM files WHERE id = ?",
+            "SELECT id, session_id, name, type, size FROM files WHERE id = ?",
             (file_id,)
         ).fetchone()
-        if row:
-            return dict(row)
-    return None
-
+        return row
 
-# Initialize database on module load
-init_db()
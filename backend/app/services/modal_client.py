@@ -1,45 +1,83 @@
 """Modal client for interacting with the agent sandbox using Claude Agent SDK."""
 
 import asyncio
-import queue
-import threading
+from typing import AsyncIterator, BinaryIO
 
 import modal
+import orjson
 
 # Default account ID for demo
 DEFAULT_ACCOUNT_ID = "demo-account-001"
 
 
+# Deployed Modal app holding the agent functions
+MODAL_APP_NAME = "claude-agent-modal-box"
+
+# Function handles are bound once at import. from_name() is lazy: nothing touches
+# the network until first use (or init_modal_client()), so import works offline.
+RUN_AGENT_STREAMING = modal.Function.from_name(MODAL_APP_NAME, "run_agent_streaming")
+DELETE_FILE = modal.Function.from_name(MODAL_APP_NAME, "delete_file")
+LIST_SESSION_FILES = modal.Function.from_name(MODAL_APP_NAME, "list_session_files")
+CLEANUP_SESSION = modal.Function.from_name(MODAL_APP_NAME, "cleanup_session")
+GET_SANDBOX_STATUS = modal.Function.from_name(MODAL_APP_NAME, "get_sandbox_status")
+WARM_SANDBOX = modal.Function.from_name(MODAL_APP_NAME, "warm_sandbox")
+INVALIDATE_SANDBOX = modal.Function.from_name(MODAL_APP_NAME, "invalidate_sandbox")
+INTERRUPT_AGENT = modal.Function.from_name(MODAL_APP_NAME, "interrupt_agent")
+GET_SESSION_MESSAGES = modal.Function.from_name(MODAL_APP_NAME, "get_session_messages")
+
+# In-flight warm_sandbox calls by (account_id, session_id), so concurrent warm-ups
+# of one session (double clicks, several tabs) share a single Modal call
+_pending_warmups: dict[tuple[str, str], asyncio.Task] = {}
+
+# Claude SDK session ID per app session, learned from the agent's init events and
+# passed back on later turns so the worker doesn't look it up in the sandbox
+_claude_session_ids: dict[str, str] = {}
+
+# Prefix of the init event, which is the only one call_agent_streaming parses
+_INIT_EVENT_PREFIX = '{"type":"init"'
+
+# Volume holding uploaded session files, mounted at /workspace inside Modal,
+# so volume paths are /{account_id}/{session_id}/...
+WORKSPACE_VOLUME = modal.Volume.from_name("agent-workspace", create_if_missing=True)
+
+
 def get_agent_functions():
     """Get references to the deployed Modal functions."""
-    # Using the sandbox-based approach with Claude Agent SDK (following Modal/Claude guidelines)
-    run_agent_streaming = modal.Function.from_name("claude-agent-modal-box", "run_agent_streaming")
-    save_file = modal.Function.from_name("claude-agent-modal-box", "save_file")
-    delete_file = modal.Function.from_name("claude-agent-modal-box", "delete_file")
-    get_file_content = modal.Function.from_name("claude-agent-modal-box", "get_file_content")
-    list_session_files = modal.Function.from_name("claude-agent-modal-box", "list_session_files")
-    cleanup_session = modal.Function.from_name("claude-agent-modal-box", "cleanup_session")
-    get_sandbox_status = modal.Function.from_name("claude-agent-modal-box", "get_sandbox_status")
-    warm_sandbox = modal.Function.from_name("claude-agent-modal-box", "warm_sandbox")
-    invalidate_sandbox = modal.Function.from_name("claude-agent-modal-box", "invalidate_sandbox")
-    interrupt_agent = modal.Function.from_name("claude-agent-modal-box", "interrupt_agent")
-    get_session_messages = modal.Function.from_name("claude-agent-modal-box", "get_session_messages")
-
     return {
-        "run_agent_streaming": run_agent_streaming,
-        "save_file": save_file,
-        "delete_file": delete_file,
-        "get_file_content": get_file_content,
-        "list_session_files": list_session_files,
-        "cleanup_session": cleanup_session,
-        "get_sandbox_status": get_sandbox_status,
-        "warm_sandbox": warm_sandbox,
-        "invalidate_sandbox": invalidate_sandbox,
-        "interrupt_agent": interrupt_agent,
-        "get_session_messages": get_session_messages,
+        "run_agent_streaming": RUN_AGENT_STREAMING,
+        "delete_file": DELETE_FILE,
+        "list_session_files": LIST_SESSION_FILES,
+        "cleanup_session": CLEANUP_SESSION,
+        "get_sandbox_status": GET_SANDBOX_STATUS,
+        "warm_sandbox": WARM_SANDBOX,
+        "invalidate_sandbox": INVALIDATE_SANDBOX,
+        "interrupt_agent": INTERRUPT_AGENT,
+        "get_session_messages": GET_SESSION_MESSAGES,
     }
 
 
+def get_workspace_volume():
+    """Get a reference to the Modal volume that holds uploaded session files."""
+    return WORKSPACE_VOLUME
+
+
+async def init_modal_client():
+    """
+    Connect to Modal and resolve every function/volume handle up front.
+
+    The SDK keeps one client (and gRPC channel) per process, shared by all
+    handles; doing the handshake and lookups at startup keeps them off the
+    first user request. Failures are logged, never raised.
+    """
+    try:
+        client = await modal.Client.from_env.aio()
+        handles = [*get_agent_functions().values(), get_workspace_volume()]
+        await asyncio.gather(*(handle.hydrate.aio(client=client) for handle in handles))
+        print(f"Modal client ready ({len(handles)} handles resolved)")
+    except Exception as e:
+        print(f"Warning: Failed to initialize Modal client: {e}")
+
+
 async def call_agent_streaming(
     session_id: str,
     user_message: str,
@@ -67,68 +105,48 @@ async def call_agent_streaming(
     Yields:
         JSON string events
     """
-    functions = get_agent_functions()
-    q: queue.Queue = queue.Queue()
-    done_sentinel = object()
+    # Modal's async generator API streams events on the event loop directly
+    async for event in RUN_AGENT_STREAMING.remote_gen.aio(
+        account_id=account_id,
+        session_id=session_id,
+        user_message=user_message,
+        resume_claude_session_id=_claude_session_ids.get(session_id),
+    ):
+        if event.startswith(_INIT_EVENT_PREFIX):
+            claude_session_id = orjson.loads(event).get("session_id")
+            if claude_session_id:
+                _claude_session_ids[session_id] = claude_session_id
+        yield event
 
-    def run_generator():
-        try:
-            for event in functions["run_agent_streaming"].remote_gen(
-                account_id=account_id,
-                session_id=session_id,
-                user_message=user_message,
-            ):
-                q.put(event)
-        except Exception as e:
-            q.put(e)
-        finally:
-            q.put(done_sentinel)
-
-    # Start the generator in a background thread
-    thread = threading.Thread(target=run_generator, daemon=True)
-    thread.start()
-
-    # Yield items from the queue asynchronously
-    loop = asyncio.get_event_loop()
-    while True:
-        # Use run_in_executor to avoid blocking the event loop
-        item = await loop.run_in_executor(None, q.get)
-        if item is done_sentinel:
-            break
-        if isinstance(item, Exception):
-            raise item
-        yield item
-
-
-async def save_file_to_modal(
+
+async def upload_files_to_modal(
     session_id: str,
-    filename: str,
-    content: bytes,
+    files: list[tuple[str, BinaryIO]],
     account_id: str = DEFAULT_ACCOUNT_ID
-) -> dict:
+) -> list[dict]:
     """
-    Save a file to the Modal volume (no sandbox operations).
+    Stream files straight into the Modal workspace volume (no sandbox operations).
 
-    This just saves the file. Call invalidate_and_warm_sandbox() separately
-    after all files are uploaded to refresh the sandbox.
+    File contents are never loaded into memory or sent as a function argument:
+    the volume client reads each file object in blocks and uploads everything
+    in a single batch, committed on exit.
+    Call invalidate_and_warm_sandbox() afterwards to refresh the sandbox.
 
     Args:
         session_id: The session ID
-        filename: Name of the file
-        content: File content as bytes
+        files: (filename, binary file object) pairs
         account_id: The account ID
 
     Returns:
-        dict with file info
+        list of dicts with file info
     """
-    functions = get_agent_functions()
-    result = functions["save_file"].remote(
-        account_id=account_id,
-        session_id=session_id,
-        filename=filename,
-        content=content,
-    )
-    return result
+    async with WORKSPACE_VOLUME.batch_upload(force=True) as batch:
+        for filename, fileobj in files:
+            batch.put_file(fileobj, f"/{account_id}/{session_id}/{filename}")
+    return [
+        {"filename": filename, "path": f"/workspace/{account_id}/{session_id}/{filename}"}
+        for filename, _ in files
+    ]
 
 
 async def invalidate_and_warm_sandbox(
@@ -148,34 +166,50 @@ async def invalidate_and_warm_sandbox(
     Returns:
         dict with invalidation result
     """
-    functions = get_agent_functions()
-
-    invalidate_result = functions["invalidate_sandbox"].remote(
+    # The warmup is spawned server-side (non-blocking), so this is one round-trip
+    invalidate_result = await INVALIDATE_SANDBOX.remote.aio(
         account_id=account_id,
         session_id=session_id,
+        rewarm=True,
     )
     print(f"Sandbox invalidation: {invalidate_result}")
 
-    # Trigger warmup in background (spawn() is non-blocking)
-    # This ensures a new sandbox is ready without blocking the caller
-    if invalidate_result.get("invalidated"):
-        functions["warm_sandbox"].spawn(
-            account_id=account_id,
-            session_id=session_id,
-        )
-        print(f"Sandbox re-warmup triggered (background)")
-
     return invalidate_result
 
 
+async def prewarm_sandboxes(
+    session_ids: list[str],
+    account_id: str = DEFAULT_ACCOUNT_ID
+):
+    """
+    Trigger background warmups for sessions likely to be used next.
+
+    Called at backend startup so the first message to a recent session
+    hits an already-running sandbox instead of paying the cold start.
+    Failures are logged, never raised (Modal may be unreachable locally).
+
+    Args:
+        session_ids: Session IDs to warm
+        account_id: The account ID
+    """
+    for session_id in session_ids:
+        try:
+            await WARM_SANDBOX.spawn.aio(
+                account_id=account_id,
+                session_id=session_id,
+            )
+            print(f"Sandbox prewarm triggered for {session_id} (background)")
+        except Exception as e:
+            print(f"Warning: Failed to prewarm sandbox for {session_id}: {e}")
+
+
 async def delete_file_from_modal(
     session_id: str,
     filename: str,
     account_id: str = DEFAULT_ACCOUNT_ID
 ) -> dict:
     """Delete a file from the Modal volume."""
-    functions = get_agent_functions()
-    result = functions["delete_file"].remote(
+    result = await DELETE_FILE.remote.aio(
         account_id=account_id,
         session_id=session_id,
         filename=filename,
@@ -188,8 +222,7 @@ async def list_modal_files(
     account_id: str = DEFAULT_ACCOUNT_ID
 ) -> list[dict]:
     """List files in a session on Modal volume."""
-    functions = get_agent_functions()
-    result = functions["list_session_files"].remote(
+    result = await LIST_SESSION_FILES.remote.aio(
         account_id=account_id,
         session_id=session_id,
     )
@@ -201,27 +234,31 @@ async def cleanup_modal_session(
     account_id: str = DEFAULT_ACCOUNT_ID
 ) -> dict:
     """Clean up all files for a session."""
-    functions = get_agent_functions()
-    result = functions["cleanup_session"].remote(
+    _claude_session_ids.pop(session_id, None)
+    result = await CLEANUP_SESSION.remote.aio(
         account_id=account_id,
         session_id=session_id,
     )
     return result
 
 
-async def get_file_content_from_modal(
+async def stream_file_from_modal(
     session_id: str,
     filename: str,
     account_id: str = DEFAULT_ACCOUNT_ID
-) -> dict:
-    """Get file content from the Modal volume."""
-    functions = get_agent_functions()
-    result = await functions["get_file_content"].remote.aio(
-        account_id=account_id,
-        session_id=session_id,
-        filename=filename,
-    )
-    return result
+) -> AsyncIterator[bytes]:
+    """
+    Stream file content straight from the Modal volume, chunk by chunk.
+
+    The file never passes through a function call, so it is never held
+    whole in memory on either side.
+
+    Raises:
+        FileNotFoundError: On first iteration, if the file doesn't exist
+    """
+    volume_path = f"/{account_id}/{session_id}/{filename}"
+    async for chunk in WORKSPACE_VOLUME.read_file.aio(volume_path):
+        yield chunk
 
 
 async def get_sandbox_status(
@@ -229,8 +266,7 @@ async def get_sandbox_status(
     account_id: str = DEFAULT_ACCOUNT_ID
 ) -> dict:
     """Get the status of a sandbox from Modal."""
-    functions = get_agent_functions()
-    result = await functions["get_sandbox_status"].remote.aio(
+    result = await GET_SANDBOX_STATUS.remote.aio(
         account_id=account_id,
         session_id=session_id,
     )
@@ -254,12 +290,17 @@ async def warm_sandbox(
     Returns:
         dict with success status and sandbox info
     """
-    functions = get_agent_functions()
-    result = await functions["warm_sandbox"].remote.aio(
-        account_id=account_id,
-        session_id=session_id,
-    )
-    return result
+    key = (account_id, session_id)
+    task = _pending_warmups.get(key)
+    if task is None:
+        task = asyncio.ensure_future(WARM_SANDBOX.remote.aio(
+            account_id=account_id,
+            session_id=session_id,
+        ))
+        _pending_warmups[key] = task
+        task.add_done_callback(lambda _: _pending_warmups.pop(key, None))
+    # Shielded so one caller going away doesn't cancel the warm-up for the others
+    return await asyncio.shield(task)
 
 
 async def invalidate_sandbox(
@@ -280,8 +321,7 @@ async def invalidate_sandbox(
     Returns:
         dict with invalidation status
     """
-    functions = get_agent_functions()
-    result = await functions["invalidate_sandbox"].remote.aio(
+    result = await INVALIDATE_SANDBOX.remote.aio(
         account_id=account_id,
         session_id=session_id,
     )
@@ -306,8 +346,7 @@ async def get_session_messages(session_id: str) -> dict:
         - timestamp: ISO timestamp
         - contentBlocks: array of {type: "text"|"tool_call", text?, toolCall?}
     """
-    functions = get_agent_functions()
-    result = await functions["get_session_messages"].remote.aio(session_id)
+    result = await GET_SESSION_MESSAGES.remote.aio(session_id)
     return result
 
 
@@ -328,8 +367,7 @@ async def interrupt_agent(
     Returns:
         dict with {"interrupted": bool, "sandbox_name": str, "message": str}
     """
-    functions = get_agent_functions()
-    result = await functions["interrupt_agent"].remote.aio(
+    result = await INTERRUPT_AGENT.remote.aio(
         account_id=account_id,
         session_id=session_id,
     )
@@ -73,6 +73,9 @@ function parseTimestamp(timestamp: string): Date {
   return new Date(timestamp)
 }
 
+// Shared decoder for binary WebSocket frames
+const textDecoder = new TextDecoder()
+
 export function useWebSocket(sessionId: string | null) {
   const [messages, setMessages] = useState<Message[]>([])
   const [isConnected, setIsConnected] = useState(false)
@@ -207,6 +210,8 @@ export function useWebSocket(sessionId: string | null) {
     if (!sessionId) return
 
     const ws = createChatWebSocket(sessionId)
+    // The backend sends JSON as binary frames
+    ws.binaryType = 'arraybuffer'
     wsRef.current = ws
 
     ws.onopen = () => {
@@ -215,7 +220,9 @@ export function useWebSocket(sessionId: string | null) {
     }
 
     ws.onmessage = (event) => {
-      const data = JSON.parse(event.data)
+      const data = JSON.parse(
+        typeof event.data === 'string' ? event.data : textDecoder.decode(event.data)
+      )
 
       // Handle streaming events
       if (data.type === 'stream') {
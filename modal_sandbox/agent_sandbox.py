@@ -14,8 +14,10 @@ Architecture:
 5. Sandbox remains alive for follow-up requests (20 minute idle timeout)
 """
 
+import base64
 import modal
 import os
+import threading
 from pathlib import Path
 
 # =============================================================================
@@ -61,32 +63,47 @@ This uses the recommended streaming input mode for rich, interactive sessions:
 - Hooks support
 - Context persistence across turns
 - Real-time streaming of tool calls and results
-- Interrupt support via signal file
+- Interrupt support via the worker's interrupt FIFO
 """
 
 import argparse
 import asyncio
 import json
 import os
+import stat
 import sys
 from pathlib import Path
 
 # Add root directory to path so Python can find custom_tools package
 sys.path.insert(0, "/")
 
-# Interrupt signal file path - checked during message iteration
-INTERRUPT_SIGNAL_FILE = Path("/tmp/.interrupt_signal")
+# Interrupts arrive on the same FIFO the persistent worker watches; both ends are
+# held open so reads never block and never report EOF between writers.
+INTERRUPT_FIFO = Path("/tmp/interrupt.fifo")
+# An early `echo 1 >` can leave a regular file here, which epoll rejects
+if INTERRUPT_FIFO.exists() and not stat.S_ISFIFO(INTERRUPT_FIFO.stat().st_mode):
+    INTERRUPT_FIFO.unlink()
+if not INTERRUPT_FIFO.exists():
+    os.mkfifo(INTERRUPT_FIFO)
+INTERRUPT_FD = os.open(INTERRUPT_FIFO, os.O_RDONLY | os.O_NONBLOCK)
+_INTERRUPT_WRITE_FD = os.open(INTERRUPT_FIFO, os.O_WRONLY | os.O_NONBLOCK)
+
+# Claude session ID files, one per app session (created once at startup)
+SESSIONS_DIR = Path("/root/.claude/sessions")
+SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
 
 # AWS Bedrock is enabled via CLAUDE_CODE_USE_BEDROCK env var
 # AWS credentials are passed from Modal secrets
 
 # Setup Braintrust tracing BEFORE importing Claude Agent SDK client
-from braintrust.wrappers.claude_agent_sdk import setup_claude_agent_sdk
+# Skipped entirely without a key, saving the braintrust import on cold start
+if os.environ.get("BRAINTRUST_API_KEY"):
+    from braintrust.wrappers.claude_agent_sdk import setup_claude_agent_sdk
 
-setup_claude_agent_sdk(
-    project="claude-agent-modal-box",
-    api_key=os.environ.get("BRAINTRUST_API_KEY"),
-)
+    setup_claude_agent_sdk(
+        project="claude-agent-modal-box",
+        api_key=os.environ["BRAINTRUST_API_KEY"],
+    )
 
 from claude_agent_sdk import (
     ClaudeAgentOptions,
@@ -106,33 +123,55 @@ def emit_event(event_type: str, data: dict):
 
 
 def check_interrupt_signal() -> bool:
-    """Check if interrupt signal file exists and clear it."""
-    if INTERRUPT_SIGNAL_FILE.exists():
-        INTERRUPT_SIGNAL_FILE.unlink()  # Clear the signal
-        return True
-    return False
+    """Drain pending bytes from the interrupt FIFO; True if there were any."""
+    received = False
+    while True:
+        try:
+            chunk = os.read(INTERRUPT_FD, 4096)
+        except BlockingIOError:
+            return received
+        if not chunk:
+            return received
+        received = True
 
 
 def clear_interrupt_signal():
     """Clear any existing interrupt signal at startup."""
-    if INTERRUPT_SIGNAL_FILE.exists():
-        INTERRUPT_SIGNAL_FILE.unlink()
+    check_interrupt_signal()
 
 
 def truncate_content(content, max_length: int = 500) -> str:
     """Truncate content for display, preserving useful info."""
-    if content is None:
+    # Plain strings are the common case, check them first
+    if isinstance(content, str):
+        pass
+    elif content is None:
         return ""
-    if isinstance(content, list):
-        # Handle list of content blocks
-        text_parts = []
-        for item in content:
-            if isinstance(item, dict) and item.get("type") == "text":
-                text_parts.append(item.get("text", ""))
-            elif isinstance(item, str):
-                text_parts.append(item)
-        content = "\n".join(text_parts)
-    content = str(content)
+    elif isinstance(content, list):
+        if len(content) == 1 and isinstance(content[0], dict) and content[0].get("type") == "text":
+            # Single text block, no join needed
+            content = content[0].get("text", "")
+        else:
+            # Join only as many blocks as fill max_length, but count them all
+            parts = []
+            kept = 0
+            total = -1  # No separator before the first block
+            for item in content:
+                if isinstance(item, str):
+                    text = item
+                elif isinstance(item, dict) and item.get("type") == "text":
+                    text = item.get("text", "")
+                else:
+                    continue
+                total += len(text) + 1
+                if kept <= max_length:
+                    parts.append(text)
+                    kept += len(text) + 1
+            if total > max_length:
+                return "\n".join(parts)[:max_length] + f"... ({total} chars total)"
+            return "\n".join(parts)
+    else:
+        content = str(content)
     if len(content) > max_length:
         return content[:max_length] + f"... ({len(content)} chars total)"
     return content
@@ -146,9 +185,7 @@ Be concise and helpful in your responses."""
 
 def get_session_file(app_session_id: str) -> Path:
     """Get the path to store Claude session ID for this app session."""
-    sessions_dir = Path("/root/.claude/sessions")
-    sessions_dir.mkdir(parents=True, exist_ok=True)
-    return sessions_dir / f"{app_session_id}.txt"
+    return SESSIONS_DIR / f"{app_session_id}.txt"
 
 
 def load_claude_session_id(app_session_id: str) -> str | None:
@@ -353,28 +390,46 @@ if __name__ == "__main__":
 PERSISTENT_WORKER_SCRIPT = r'''#!/usr/bin/env python3
 """Persistent worker process that keeps Python imports loaded between requests.
 
-Communication protocol (file-based):
-- Request: Write JSON to /tmp/worker_request.json
-- Response: Worker writes JSON lines to /tmp/worker_output.jsonl
-- Ready signal: Worker writes {"type": "worker_ready"} when ready for requests
-- Completion: Worker writes {"type": "request_done"} when finished
+Communication protocol (Unix domain socket at /tmp/worker.sock):
+- Request: Client connects and sends one JSON line
+- Response: Worker streams JSON lines back on the same connection
+- Ready signal: Worker creates /tmp/worker_ready once the socket is listening
+- Completion: Worker writes {"type": "request_done"} and closes the connection
 
 This eliminates the ~3.7 second import overhead on each request.
 """
 
 import asyncio
+import dataclasses
 import json
 import os
 import signal
+import stat
 import sys
 import time
 from pathlib import Path
 
-# Paths for file-based communication
-REQUEST_FILE = Path("/tmp/worker_request.json")
-OUTPUT_FILE = Path("/tmp/worker_output.jsonl")
+import orjson
+
+# Socket the host connects to, and the file that marks it as listening
+WORKER_SOCKET = Path("/tmp/worker.sock")
 READY_FILE = Path("/tmp/worker_ready")
-INTERRUPT_SIGNAL_FILE = Path("/tmp/.interrupt_signal")
+
+# Claude session ID files, one per app session (created once at startup)
+SESSIONS_DIR = Path("/root/.claude/sessions")
+SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
+
+# Interrupts arrive as a write to this FIFO (e.g. `echo 1 > /tmp/interrupt.fifo`).
+# The worker holds both ends open: the read end is watched by the event loop,
+# and the spare write end keeps it from reporting EOF between writers.
+INTERRUPT_FIFO = Path("/tmp/interrupt.fifo")
+# An early `echo 1 >` can leave a regular file here, which epoll rejects
+if INTERRUPT_FIFO.exists() and not stat.S_ISFIFO(INTERRUPT_FIFO.stat().st_mode):
+    INTERRUPT_FIFO.unlink()
+if not INTERRUPT_FIFO.exists():
+    os.mkfifo(INTERRUPT_FIFO)
+INTERRUPT_FD = os.open(INTERRUPT_FIFO, os.O_RDONLY | os.O_NONBLOCK)
+_INTERRUPT_WRITE_FD = os.open(INTERRUPT_FIFO, os.O_WRONLY | os.O_NONBLOCK)
 
 # Add root directory to path so Python can find custom_tools package
 sys.path.insert(0, "/")
@@ -385,16 +440,24 @@ sys.path.insert(0, "/")
 # ============================================================
 # Import everything at startup (one-time ~3.7s cost)
 # ============================================================
-from braintrust.wrappers.claude_agent_sdk import setup_claude_agent_sdk
+# Skipped entirely without a key, saving the braintrust import on cold start
+if os.environ.get("BRAINTRUST_API_KEY"):
+    from braintrust.wrappers.claude_agent_sdk import setup_claude_agent_sdk
 
-setup_claude_agent_sdk(
-    project="claude-agent-modal-box",
-    api_key=os.environ.get("BRAINTRUST_API_KEY"),
-)
+    setup_claude_agent_sdk(
+        project="claude-agent-modal-box",
+        api_key=os.environ["BRAINTRUST_API_KEY"],
+    )
 
 from claude_agent_sdk import (
+    AssistantMessage,
     ClaudeAgentOptions,
     ClaudeSDKClient,
+    ResultMessage,
+    SystemMessage,
+    TextBlock,
+    ToolResultBlock,
+    ToolUseBlock,
     create_sdk_mcp_server,
 )
 
@@ -405,41 +468,111 @@ from custom_tools import ALL_TOOLS, get_mcp_tool_names
 # Helper functions (same as agent_entrypoint.py)
 # ============================================================
 
+class _EmitBuffer:
+    """Coalesces event lines into fewer socket writes (flushed at 4 KB or after 10 ms)."""
+
+    FLUSH_BYTES = 4096
+    FLUSH_DELAY = 0.01
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.parts: list[bytes] = []
+        self.size = 0
+        self.flush_handle: asyncio.TimerHandle | None = None
+
+    def write(self, data: bytes):
+        self.parts.append(data)
+        self.size += len(data)
+        if self.size >= self.FLUSH_BYTES:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.FLUSH_DELAY, self.flush)
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if self.parts:
+            self.writer.write(b"".join(self.parts))
+            self.parts.clear()
+            self.size = 0
+
+    async def drain(self):
+        await self.writer.drain()
+
+
+# Buffer for the connection being served; emit_event writes to it
+_output: _EmitBuffer | None = None
+_request_lock: asyncio.Lock | None = None
+
+
+# Pre-encoded '{"type":"..."' prefixes, so emit_event splices the payload in
+# instead of copying it into a new dict
+_TYPE_PREFIXES: dict[str, bytes] = {}
+
+
 def emit_event(event_type: str, data: dict):
-    """Append a JSON event to output file."""
-    event = {"type": event_type, **data}
-    with open(OUTPUT_FILE, "a") as f:
-        f.write(json.dumps(event) + "\n")
-        f.flush()
+    """Queue a JSON event line for the connected client."""
+    prefix = _TYPE_PREFIXES.get(event_type)
+    if prefix is None:
+        prefix = _TYPE_PREFIXES[event_type] = b'{"type":' + orjson.dumps(event_type)
+    body = orjson.dumps(data)
+    if len(body) > 2:
+        _output.write(prefix + b"," + body[1:] + b"\n")
+    else:
+        _output.write(prefix + b"}\n")
 
 
-def check_interrupt_signal() -> bool:
-    """Check if interrupt signal file exists and clear it."""
-    if INTERRUPT_SIGNAL_FILE.exists():
-        INTERRUPT_SIGNAL_FILE.unlink()
-        return True
-    return False
+def read_interrupt_signal() -> bool:
+    """Drain pending bytes from the interrupt FIFO; True if there were any."""
+    received = False
+    while True:
+        try:
+            chunk = os.read(INTERRUPT_FD, 4096)
+        except BlockingIOError:
+            return received
+        if not chunk:
+            return received
+        received = True
 
 
 def clear_interrupt_signal():
-    """Clear any existing interrupt signal at startup."""
-    if INTERRUPT_SIGNAL_FILE.exists():
-        INTERRUPT_SIGNAL_FILE.unlink()
+    """Discard any interrupt left over from a previous request."""
+    read_interrupt_signal()
 
 
 def truncate_content(content, max_length: int = 500) -> str:
     """Truncate content for display, preserving useful info."""
-    if content is None:
+    # Plain strings are the common case, check them first
+    if isinstance(content, str):
+        pass
+    elif content is None:
         return ""
-    if isinstance(content, list):
-        text_parts = []
-        for item in content:
-            if isinstance(item, dict) and item.get("type") == "text":
-                text_parts.append(item.get("text", ""))
-            elif isinstance(item, str):
-                text_parts.append(item)
-        content = "\n".join(text_parts)
-    content = str(content)
+    elif isinstance(content, list):
+        if len(content) == 1 and isinstance(content[0], dict) and content[0].get("type") == "text":
+            # Single text block, no join needed
+            content = content[0].get("text", "")
+        else:
+            # Join only as many blocks as fill max_length, but count them all
+            parts = []
+            kept = 0
+            total = -1  # No separator before the first block
+            for item in content:
+                if isinstance(item, str):
+                    text = item
+                elif isinstance(item, dict) and item.get("type") == "text":
+                    text = item.get("text", "")
+                else:
+                    continue
+                total += len(text) + 1
+                if kept <= max_length:
+                    parts.append(text)
+                    kept += len(text) + 1
+            if total > max_length:
+                return "\n".join(parts)[:max_length] + f"... ({total} chars total)"
+            return "\n".join(parts)
+    else:
+        content = str(content)
     if len(content) > max_length:
         return content[:max_length] + f"... ({len(content)} chars total)"
     return content
@@ -450,26 +583,50 @@ You can read files, search through documents, and help with various tasks.
 When working with files, use the available tools to read and analyze content in the /data directory.
 Be concise and helpful in your responses."""
 
+# Options shared by every request; process_request only fills in the session to resume.
+# The MCP server holds no per-request state, so one instance serves all requests.
+AGENT_OPTIONS = ClaudeAgentOptions(
+    model="us.anthropic.claude-opus-4-5-20251101-v1:0",
+    system_prompt=SYSTEM_PROMPT,
+    cwd="/data",
+    mcp_servers={
+        "tools": create_sdk_mcp_server(name="tools", version="1.0.0", tools=ALL_TOOLS)
+    },
+    allowed_tools=["Read", "Glob", "Grep"] + get_mcp_tool_names("tools"),
+    permission_mode="acceptEdits",
+    max_turns=25,
+    include_partial_messages=True,
+)
+
 
 def get_session_file(app_session_id: str) -> Path:
     """Get the path to store Claude session ID for this app session."""
-    sessions_dir = Path("/root/.claude/sessions")
-    sessions_dir.mkdir(parents=True, exist_ok=True)
-    return sessions_dir / f"{app_session_id}.txt"
+    return SESSIONS_DIR / f"{app_session_id}.txt"
+
+
+# Claude SDK session IDs already read or written by this worker, so follow-up
+# turns skip the session file entirely
+_claude_session_ids: dict[str, str] = {}
 
 
 def load_claude_session_id(app_session_id: str) -> str | None:
-    """Load Claude SDK session ID from persistent storage."""
+    """Load Claude SDK session ID from memory, falling back to persistent storage."""
+    if app_session_id in _claude_session_ids:
+        return _claude_session_ids[app_session_id]
     session_file = get_session_file(app_session_id)
     if session_file.exists():
-        return session_file.read_text().strip()
+        _claude_session_ids[app_session_id] = session_file.read_text().strip()
+        return _claude_session_ids[app_session_id]
     return None
 
 
 def save_claude_session_id(app_session_id: str, claude_session_id: str) -> None:
     """Save Claude SDK session ID to persistent storage."""
+    if _claude_session_ids.get(app_session_id) == claude_session_id:
+        return  # Resumed session, the file already holds this ID
     session_file = get_session_file(app_session_id)
     session_file.write_text(claude_session_id)
+    _claude_session_ids[app_session_id] = claude_session_id
 
 
 async def create_message_generator(user_msg: str):
@@ -484,45 +641,70 @@ async def create_message_generator(user_msg: str):
 
 
 async def monitor_interrupt_signal(client, interrupt_event: asyncio.Event):
-    """Background task to monitor for interrupt signal."""
-    while not interrupt_event.is_set():
-        if check_interrupt_signal():
-            emit_event("interrupted", {"reason": "user_requested"})
-            try:
-                await client.interrupt()
-            except Exception as e:
-                emit_event("text", {"content": f"[Interrupt error: {e}]"})
-            interrupt_event.set()
-            break
-        await asyncio.sleep(0.2)
+    """Background task that wakes when the interrupt FIFO becomes readable."""
+    loop = asyncio.get_running_loop()
+    signalled = loop.create_future()
 
+    def on_readable():
+        if read_interrupt_signal() and not signalled.done():
+            signalled.set_result(None)
 
-async def process_request(user_msg: str, app_session_id: str):
-    """Process a single agent request (reuses loaded imports)."""
+    loop.add_reader(INTERRUPT_FD, on_readable)
+    try:
+        await signalled
+    finally:
+        loop.remove_reader(INTERRUPT_FD)
 
-    clear_interrupt_signal()
-    claude_session_id = load_claude_session_id(app_session_id)
+    emit_event("interrupted", {"reason": "user_requested"})
+    try:
+        await client.interrupt()
+    except Exception as e:
+        emit_event("text", {"content": f"[Interrupt error: {e}]"})
+    interrupt_event.set()
 
-    # Create MCP server with custom tools
-    tools_server = create_sdk_mcp_server(
-        name="tools",
-        version="1.0.0",
-        tools=ALL_TOOLS
-    )
 
-    mcp_tools = get_mcp_tool_names("tools")
+def handle_tool_use_block(block: ToolUseBlock, pending_tools: dict):
+    pending_tools[block.id] = block.name
+    emit_event("tool_use", {
+        "tool_use_id": block.id,
+        "tool": block.name,
+        "input": block.input if isinstance(block.input, dict) else str(block.input)
+    })
 
-    options = ClaudeAgentOptions(
-        model="us.anthropic.claude-opus-4-5-20251101-v1:0",
-        system_prompt=SYSTEM_PROMPT,
-        cwd="/data",
-        mcp_servers={"tools": tools_server},
-        allowed_tools=["Read", "Glob", "Grep"] + mcp_tools,
-        permission_mode="acceptEdits",
-        max_turns=25,
-        resume=claude_session_id,
-        include_partial_messages=True,
-    )
+
+def handle_tool_result_block(block: ToolResultBlock, pending_tools: dict):
+    emit_event("tool_result", {
+        "tool_use_id": block.tool_use_id,
+        "tool": pending_tools.pop(block.tool_use_id, 'unknown'),
+        "content": truncate_content(block.content),
+        "is_error": bool(block.is_error)
+    })
+
+
+# Content block type -> handler, so each block costs one type() and one dict lookup.
+# Text blocks are not in here: process_request merges each run of them into one event.
+BLOCK_HANDLERS = {
+    ToolUseBlock: handle_tool_use_block,
+    ToolResultBlock: handle_tool_result_block,
+}
+
+
+async def process_request(
+    user_msg: str, app_session_id: str, resume_claude_session_id: str | None = None
+):
+    """Process a single agent request (reuses loaded imports).
+
+    resume_claude_session_id is the Claude session to resume when the caller
+    already knows it, which skips the session file lookup.
+    """
+
+    clear_interrupt_signal()
+    if resume_claude_session_id:
+        claude_session_id = resume_claude_session_id
+    else:
+        claude_session_id = load_claude_session_id(app_session_id)
+
+    options = dataclasses.replace(AGENT_OPTIONS, resume=claude_session_id)
 
     pending_tools = {}
 
@@ -537,67 +719,45 @@ async def process_request(user_msg: str, app_session_id: str):
                 if interrupt_event.is_set():
                     break
 
-                msg_class = type(msg).__name__
-                msg_subtype = getattr(msg, 'subtype', None)
-
-                if msg_subtype == 'init':
-                    new_session_id = getattr(msg, 'session_id', None)
-                    if new_session_id is None and hasattr(msg, 'data'):
-                        data = msg.data
-                        if isinstance(data, dict):
-                            new_session_id = data.get('session_id')
-                    if new_session_id:
-                        save_claude_session_id(app_session_id, new_session_id)
-                    emit_event("init", {"session_id": new_session_id})
-                    continue
-
-                if msg_class == 'AssistantMessage' and hasattr(msg, 'content'):
-                    content_blocks = msg.content
-
-                    if content_blocks and isinstance(content_blocks, list):
-                        for block in content_blocks:
-                            block_class = type(block).__name__
-                            block_type = getattr(block, 'type', None)
-
-                            if block_class == 'TextBlock' or block_type == 'text':
-                                text = getattr(block, 'text', '')
-                                if text:
-                                    emit_event("text", {"content": text})
-
-                            elif block_class == 'ToolUseBlock' or block_type == 'tool_use':
-                                tool_id = getattr(block, 'id', '')
-                                tool_name = getattr(block, 'name', 'unknown')
-                                tool_input = getattr(block, 'input', {})
-                                pending_tools[tool_id] = tool_name
-                                emit_event("tool_use", {
-                                    "tool_use_id": tool_id,
-                                    "tool": tool_name,
-                                    "input": tool_input if isinstance(tool_input, dict) else str(tool_input)
-                                })
-
-                            elif block_class == 'ToolResultBlock' or block_type == 'tool_result':
-                                tool_use_id = getattr(block, 'tool_use_id', '')
-                                content = getattr(block, 'content', '')
-                                is_error = getattr(block, 'is_error', False)
-                                tool_name = pending_tools.pop(tool_use_id, 'unknown')
-                                emit_event("tool_result", {
-                                    "tool_use_id": tool_use_id,
-                                    "tool": tool_name,
-                                    "content": truncate_content(content),
-                                    "is_error": bool(is_error)
-                                })
+                if isinstance(msg, AssistantMessage):
+                    # Runs of text blocks go out as one event, joined the way the
+                    # frontend and backend join separate text events
+                    text_parts = []
+                    for block in msg.content:
+                        if type(block) is TextBlock:
+                            if block.text:
+                                text_parts.append(block.text)
+                            continue
+                        if text_parts:
+                            emit_event("text", {"content": "\n\n".join(text_parts)})
+                            text_parts.clear()
+                        handler = BLOCK_HANDLERS.get(type(block))
+                        if handler:
+                            handler(block, pending_tools)
+                    if text_parts:
+                        emit_event("text", {"content": "\n\n".join(text_parts)})
+
+                elif isinstance(msg, SystemMessage):
+                    if msg.subtype == 'init':
+                        new_session_id = msg.data.get('session_id')
+                        if new_session_id:
+                            save_claude_session_id(app_session_id, new_session_id)
+                        emit_event("init", {"session_id": new_session_id})
+                        continue
 
-                if msg_class == 'ResultMessage':
+                elif isinstance(msg, ResultMessage):
                     result_data = {
-                        "duration_ms": getattr(msg, 'duration_ms', 0),
-                        "num_turns": getattr(msg, 'num_turns', 0),
-                        "session_id": getattr(msg, 'session_id', ''),
+                        "duration_ms": msg.duration_ms,
+                        "num_turns": msg.num_turns,
+                        "session_id": msg.session_id,
                     }
-                    total_cost = getattr(msg, 'total_cost_usd', None)
-                    if total_cost is not None:
-                        result_data["total_cost_usd"] = total_cost
+                    if msg.total_cost_usd is not None:
+                        result_data["total_cost_usd"] = msg.total_cost_usd
                     emit_event("result", result_data)
 
+                # Let a slow reader push back on the agent loop
+                await _output.drain()
+
         finally:
             monitor_task.cancel()
             try:
@@ -611,43 +771,63 @@ async def process_request(user_msg: str, app_session_id: str):
             emit_event("done", {})
 
 
-async def main_loop():
-    """Main worker loop - waits for requests and processes them."""
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Serve one request per connection, streaming its events back."""
+    global _output
+    async with _request_lock:
+        _output = _EmitBuffer(writer)
+        try:
+            request = orjson.loads(await reader.readline())
+            user_message = request.get("user_message", "")
+            app_session_id = request.get("app_session_id", "")
 
-    # Signal that worker is ready
-    READY_FILE.touch()
-    print(json.dumps({"type": "worker_ready"}), flush=True)
+            await process_request(
+                user_message, app_session_id, request.get("resume_claude_session_id")
+            )
 
-    while True:
-        # Wait for request file to appear
-        if REQUEST_FILE.exists():
+            # Signal completion
+            emit_event("request_done", {})
+
+        except Exception as e:
+            emit_event("error", {"message": str(e)})
+            emit_event("request_done", {})
+
+        finally:
+            _output.flush()
+            _output = None
             try:
-                # Read and parse request
-                request = json.loads(REQUEST_FILE.read_text())
-                REQUEST_FILE.unlink()  # Clear request file
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass  # Client went away mid-stream
 
-                # Clear output file for new response
-                if OUTPUT_FILE.exists():
-                    OUTPUT_FILE.unlink()
-                OUTPUT_FILE.touch()
 
-                # Process the request
-                user_message = request.get("user_message", "")
-                app_session_id = request.get("app_session_id", "")
+def log_preload_failure(future: asyncio.Future) -> None:
+    """Log a failed background import; the tools retry it on first use."""
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Preload failed: {future.exception()!r}", flush=True)
 
-                emit_event("worker_processing", {"request_id": request.get("request_id", "")})
 
-                await process_request(user_message, app_session_id)
+async def main_loop():
+    """Main worker loop - serves requests on the Unix socket."""
+    global _request_lock
+    # Requests share one Claude session per sandbox, so handle them one at a time
+    _request_lock = asyncio.Lock()
 
-                # Signal completion
-                emit_event("request_done", {})
+    WORKER_SOCKET.unlink(missing_ok=True)
+    server = await asyncio.start_unix_server(handle_connection, path=str(WORKER_SOCKET))
 
-            except Exception as e:
-                emit_event("error", {"message": str(e)})
-                emit_event("request_done", {})
+    # Signal that worker is ready
+    READY_FILE.touch()
+    print(json.dumps({"type": "worker_ready"}), flush=True)
 
-        # Small sleep to avoid busy-waiting
-        await asyncio.sleep(0.05)
+    # The file tools import pandas lazily; load it off the event loop while idle
+    pandas_preload = asyncio.get_running_loop().run_in_executor(None, __import__, "pandas")
+    pandas_preload.add_done_callback(log_preload_failure)
+
+    async with server:
+        await server.serve_forever()
 
 
 def handle_sigterm(signum, frame):
@@ -661,6 +841,23 @@ if __name__ == "__main__":
     asyncio.run(main_loop())
 '''
 
+# Run inside the sandbox per request: forwards the request line from stdin to the
+# worker socket and copies the streamed JSON lines to stdout for the host to read.
+WORKER_CLIENT_CODE = r'''
+import socket
+import sys
+
+sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+sock.connect("/tmp/worker.sock")
+sock.sendall(sys.stdin.buffer.readline())
+while True:
+    chunk = sock.recv(65536)
+    if not chunk:
+        break
+    sys.stdout.buffer.write(chunk)
+    sys.stdout.buffer.flush()
+'''
+
 # =============================================================================
 # Tool Code - Embedded as string literals (Modal-safe)
 # =============================================================================
@@ -682,13 +879,28 @@ FILE_TOOLS_CODE = r'''
 """File reading tools."""
 
 import json
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any, Dict, Optional
 
-import pandas as pd
+# pandas is imported on first use: it is the slowest import on the worker's
+# path to ready, and the worker preloads it in the background afterwards
+_pd = None
 
-# Global cache for Excel data - allows efficient queries on large files
-_excel_cache: Dict[str, pd.DataFrame] = {}
+
+def _pandas():
+    """Return the pandas module, importing it on first call."""
+    global _pd
+    if _pd is None:
+        import pandas
+        _pd = pandas
+    return _pd
+
+
+# Global cache for Excel data - allows efficient queries on large files.
+# Holds the most recently read sheets only, so a long-lived worker stays bounded.
+_excel_cache: "OrderedDict[str, pandas.DataFrame]" = OrderedDict()
+_EXCEL_CACHE_MAX = 8
 
 
 def read_excel(
@@ -717,12 +929,18 @@ def read_excel(
         }
     """
     try:
-        df = pd.read_excel(file_path, sheet_name=sheet_name, skiprows=skiprows)
+        # calamine (Rust) parses workbooks several times faster than openpyxl
+        df = _pandas().read_excel(
+            file_path, sheet_name=sheet_name, skiprows=skiprows, engine="calamine"
+        )
 
         # Store full dataframe in cache for later use
         global _excel_cache
         cache_key = f"{file_path}:{sheet_name}:{skiprows}"
         _excel_cache[cache_key] = df
+        _excel_cache.move_to_end(cache_key)
+        while len(_excel_cache) > _EXCEL_CACHE_MAX:
+            _excel_cache.popitem(last=False)
 
         result = {
             "shape": list(df.shape),
@@ -762,7 +980,7 @@ def read_csv(file_path: str) -> Dict[str, Any]:
         }
     """
     try:
-        df = pd.read_csv(file_path)
+        df = _pandas().read_csv(file_path)
         return {
             "data": df.to_dict('records'),
             "shape": list(df.shape),
@@ -836,15 +1054,21 @@ These tools are registered with the Claude Agent SDK MCP server
 and made available to the agent.
 """
 
-import json
 from typing import Any, Dict
 
+import orjson
+
 from claude_agent_sdk import tool
 
 # Import tool implementations
 from tools.file_tools import read_excel, read_csv, read_json, list_files
 
 
+def _dumps(result: Dict[str, Any]) -> str:
+    """Serialize a tool result as compact JSON (non-JSON values become strings)."""
+    return orjson.dumps(result, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 # =============================================================================
 # File Reading Tools
 # =============================================================================
@@ -865,7 +1089,7 @@ async def tool_read_excel(args: Dict[str, Any]) -> Dict[str, Any]:
         args.get("sheet_name"),
         args.get("skiprows")
     )
-    return {"content": [{"type": "text", "text": json.dumps(result, indent=2, default=str)}]}
+    return {"content": [{"type": "text", "text": _dumps(result)}]}
 
 
 @tool(
@@ -876,7 +1100,7 @@ async def tool_read_excel(args: Dict[str, Any]) -> Dict[str, Any]:
 async def tool_read_csv(args: Dict[str, Any]) -> Dict[str, Any]:
     """Read CSV file tool."""
     result = read_csv(args["file_path"])
-    return {"content": [{"type": "text", "text": json.dumps(result, indent=2, default=str)}]}
+    return {"content": [{"type": "text", "text": _dumps(result)}]}
 
 
 @tool(
@@ -887,7 +1111,7 @@ async def tool_read_csv(args: Dict[str, Any]) -> Dict[str, Any]:
 async def tool_read_json(args: Dict[str, Any]) -> Dict[str, Any]:
     """Read JSON file tool."""
     result = read_json(args["file_path"])
-    return {"content": [{"type": "text", "text": json.dumps(result, indent=2, default=str)}]}
+    return {"content": [{"type": "text", "text": _dumps(result)}]}
 
 
 @tool(
@@ -904,7 +1128,7 @@ async def tool_list_files(args: Dict[str, Any]) -> Dict[str, Any]:
         args.get("directory", "/data"),
         args.get("pattern", "*")
     )
-    return {"content": [{"type": "text", "text": json.dumps(result, indent=2, default=str)}]}
+    return {"content": [{"type": "text", "text": _dumps(result)}]}
 
 
 # =============================================================================
@@ -935,6 +1159,22 @@ ALL_TOOLS = [
 # Sandbox Image - Pre-built with Claude Agent SDK and dependencies
 # =============================================================================
 
+# Files placed into the sandbox image (path -> source)
+SANDBOX_FILES = {
+    "/tools/__init__.py": TOOLS_INIT_CODE,
+    "/tools/file_tools.py": FILE_TOOLS_CODE,
+    "/custom_tools.py": CUSTOM_TOOLS_CODE,
+    "/agent_entrypoint.py": AGENT_SCRIPT,
+    "/persistent_worker.py": PERSISTENT_WORKER_SCRIPT,
+}
+
+
+def _write_file_command(path: str, content: str) -> str:
+    """Shell command that writes content to path (base64 avoids quoting issues)."""
+    encoded = base64.b64encode(content.encode()).decode()
+    return f"mkdir -p {os.path.dirname(path)} && echo {encoded} | base64 -d > {path}"
+
+
 sandbox_image = (
     modal.Image.debian_slim(python_version="3.12")
     .apt_install("curl", "ca-certificates", "bash", "git")
@@ -946,14 +1186,70 @@ sandbox_image = (
     .pip_install(
         "claude-agent-sdk",
         "braintrust",
+        "orjson",  # Fast event serialization in the persistent worker
         # Dependencies for custom tools
         "pandas",
         "openpyxl",  # For Excel file reading
+        "python-calamine",  # Fast Excel engine used by read_excel
+    )
+    # Bake the sandbox-side code into the image and byte-compile it at build time,
+    # so new sandboxes neither write it at startup nor compile it on first run.
+    # Entrypoints use -b to get a runnable .pyc next to the source.
+    .run_commands(
+        *(_write_file_command(path, content) for path, content in SANDBOX_FILES.items()),
+        "python -m compileall -q /tools /custom_tools.py",
+        "python -m compileall -q -b /agent_entrypoint.py /persistent_worker.py",
+    )
+    # Import the worker's heavy dependencies once at build time: fails the build early
+    # if they're broken and leaves every module they pull in with a cached .pyc
+    .run_commands(
+        "python -c 'import braintrust.wrappers.claude_agent_sdk, claude_agent_sdk, pandas, python_calamine'",
+        "cd / && python -c 'import custom_tools'",
     )
 )
 
+def _sandbox_name(account_id: str, session_id: str) -> str:
+    """Name of a session's sandbox (Modal sandbox names are capped at 63 chars)."""
+    return f"agent-{account_id}-{session_id}".replace(".", "-")[:63]
+
+
+def _sandbox_entrypoint(data_dir: str) -> tuple[str, ...]:
+    """
+    Sandbox entrypoint: link the session's data dir to /data, then become the
+    persistent worker (run from its precompiled bytecode).
+
+    The worker starts with the container, with no exec round-trips, and the
+    sandbox's lifetime is tied to it: if the worker dies, the sandbox exits and
+    the next request creates a fresh one.
+    """
+    return (
+        "bash", "-c",
+        f"mkdir -p {data_dir} && rm -rf /data && ln -s {data_dir} /data && "
+        "exec python /persistent_worker.pyc > /tmp/worker.log 2>&1",
+    )
+
+
+def _wait_for_worker(sb: modal.Sandbox, timeout_seconds: int) -> bool:
+    """Wait for the worker's ready file inside the sandbox with a single exec."""
+    check = sb.exec(
+        "timeout", str(timeout_seconds),
+        "bash", "-c", "until [ -f /tmp/worker_ready ]; do sleep 0.05; done",
+    )
+    return check.wait() == 0
+
+
+def _commit_quietly(volume: modal.Volume, label: str) -> None:
+    """Commit a volume from a background thread, logging instead of raising."""
+    try:
+        volume.commit()
+    except Exception as e:
+        print(f"Background commit of {label} volume failed: {type(e).__name__}: {e}")
+    else:
+        print(f"Background commit of {label} volume done")
+
+
 # Image for the wrapper function (minimal - braintrust tracing happens inside sandbox)
-wrapper_image = modal.Image.debian_slim(python_version="3.12")
+wrapper_image = modal.Image.debian_slim(python_version="3.12").pip_install("orjson")
 
 
 # =============================================================================
@@ -973,6 +1269,8 @@ def run_agent_streaming(
     account_id: str,
     session_id: str,
     user_message: str,
+    verbose_timings: bool = False,
+    resume_claude_session_id: str | None = None,
 ):
     """
     Run the Claude Agent SDK inside a Modal Sandbox with streaming output.
@@ -985,10 +1283,18 @@ def run_agent_streaming(
     - {"type": "tool_result", "tool_use_id": "...", "status": "completed"} - Tool finished
     - {"type": "done"} - Agent finished
     - {"type": "error", "message": "..."} - Error occurred
+    - {"type": "setup_timings", "data": {...}} - Setup phase durations, once the worker is reached
+    - {"type": "timings", "data": {...}} - All phase durations, at the end
+
+    verbose_timings additionally yields a {"type": "timing", ...} event as each phase
+    finishes (used by the latency test scripts).
+
+    resume_claude_session_id is the session ID from an earlier init event, if the
+    caller has one; the worker then resumes it without reading the session file.
     """
-    import json as json_module
+    import orjson
 
-    sandbox_name = f"agent-{account_id}-{session_id}".replace(".", "-")[:63]
+    sandbox_name = _sandbox_name(account_id, session_id)
     data_dir = f"/workspace/{account_id}/{session_id}"
 
     import time
@@ -997,12 +1303,12 @@ def run_agent_streaming(
 
     def emit_timing(phase: str, duration_ms: float):
         """Emit a timing event for real-time visibility."""
-        return json_module.dumps({
+        return orjson.dumps({
             "type": "timing",
             "phase": phase,
             "duration_ms": round(duration_ms, 1),
             "elapsed_ms": round((time.time() - total_start) * 1000, 1)
-        })
+        }).decode()
 
     # Try to get existing sandbox
     t0 = time.time()
@@ -1013,7 +1319,8 @@ def run_agent_streaming(
     except modal.exception.NotFoundError:
         pass
     timings["sandbox_lookup"] = (time.time() - t0) * 1000
-    yield emit_timing("sandbox_lookup", timings["sandbox_lookup"])
+    if verbose_timings:
+        yield emit_timing("sandbox_lookup", timings["sandbox_lookup"])
 
     # Create new sandbox if needed
     if sb is None:
@@ -1021,6 +1328,7 @@ def run_agent_streaming(
         is_new_sandbox = True
         try:
             sb = modal.Sandbox.create(
+                *_sandbox_entrypoint(data_dir),
                 app=app,
                 image=sandbox_image,
                 volumes={
@@ -1047,179 +1355,115 @@ def run_agent_streaming(
             sb = modal.Sandbox.from_name(app_name=app.name, name=sandbox_name)
             is_new_sandbox = False
         timings["sandbox_create"] = (time.time() - t0) * 1000
-        yield emit_timing("sandbox_create", timings["sandbox_create"])
+        if verbose_timings:
+            yield emit_timing("sandbox_create", timings["sandbox_create"])
 
     # Yield sandbox creation status
-    yield json_module.dumps({"type": "sandbox_status", "is_new": is_new_sandbox})
+    yield orjson.dumps({"type": "sandbox_status", "is_new": is_new_sandbox}).decode()
 
-    # Create data directory and symlink (only on new sandbox)
-    if is_new_sandbox:
-        t0 = time.time()
-        sb.exec("bash", "-c", f"mkdir -p {data_dir} && rm -rf /data && ln -s {data_dir} /data")
-        timings["mkdir_symlink"] = (time.time() - t0) * 1000
-        yield emit_timing("mkdir_symlink", timings["mkdir_symlink"])
-    else:
-        yield json_module.dumps({"type": "timing", "phase": "skip_mkdir_symlink", "duration_ms": 0, "elapsed_ms": round((time.time() - total_start) * 1000, 1), "reason": "warm_sandbox"})
-
-    # Write tool files only on new sandbox
-    # Warm sandboxes already have tools from either:
+    # New sandboxes set up the data dir and start the worker from their entrypoint.
+    # Tool files and scripts are baked into the image; warm sandboxes already run
+    # a worker started by either:
     # 1. warm_sandbox() pre-warming, or
     # 2. A previous run_agent_streaming() call
     if is_new_sandbox:
-        # Create tools directory and write files (only on cold start)
-        t0 = time.time()
-        sb.exec("bash", "-c", "mkdir -p /tools")
-        timings["mkdir_tools"] = (time.time() - t0) * 1000
-        yield emit_timing("mkdir_tools", timings["mkdir_tools"])
-
-        t0 = time.time()
-        tool_files = {
-            "/tools/__init__.py": TOOLS_INIT_CODE,
-            "/tools/file_tools.py": FILE_TOOLS_CODE,
-            "/custom_tools.py": CUSTOM_TOOLS_CODE,
-        }
-
-        for file_path, content in tool_files.items():
-            if content:
-                with sb.open(file_path, "w") as f:
-                    f.write(content)
-        timings["write_tool_files"] = (time.time() - t0) * 1000
-        yield emit_timing("write_tool_files", timings["write_tool_files"])
-
-        # Write the agent script (fallback)
-        t0 = time.time()
-        with sb.open("/agent_entrypoint.py", "w") as f:
-            f.write(AGENT_SCRIPT)
-        timings["write_agent_script"] = (time.time() - t0) * 1000
-        yield emit_timing("write_agent_script", timings["write_agent_script"])
-
-        # Write and start persistent worker
-        t0 = time.time()
-        with sb.open("/persistent_worker.py", "w") as f:
-            f.write(PERSISTENT_WORKER_SCRIPT)
-        # Start worker in background using nohup
-        sb.exec("bash", "-c", "nohup python /persistent_worker.py > /tmp/worker.log 2>&1 &")
-        timings["start_worker"] = (time.time() - t0) * 1000
-        yield emit_timing("start_worker", timings["start_worker"])
-
         # Wait for worker to be ready (imports take ~3-5 seconds)
         t0 = time.time()
-        worker_available = False
-        wait_timeout = 60  # seconds
-        while (time.time() - t0) < wait_timeout:
-            check = sb.exec("test", "-f", "/tmp/worker_ready")
-            if check.wait() == 0:
-                worker_available = True
-                break
-            time.sleep(0.3)
+        worker_available = _wait_for_worker(sb, timeout_seconds=60)
         timings["worker_wait"] = (time.time() - t0) * 1000
-        yield emit_timing("worker_wait", timings["worker_wait"])
+        if verbose_timings:
+            yield emit_timing("worker_wait", timings["worker_wait"])
 
     else:
-        # Warm sandbox - tools already exist, skip everything
-        yield json_module.dumps({"type": "timing", "phase": "skip_tool_files", "duration_ms": 0, "elapsed_ms": round((time.time() - total_start) * 1000, 1), "reason": "warm_sandbox"})
+        # Warm sandbox - worker already started, skip everything
+        if verbose_timings:
+            yield orjson.dumps({"type": "timing", "phase": "skip_mkdir_symlink", "duration_ms": 0, "elapsed_ms": round((time.time() - total_start) * 1000, 1), "reason": "warm_sandbox"}).decode()
+            yield orjson.dumps({"type": "timing", "phase": "skip_tool_files", "duration_ms": 0, "elapsed_ms": round((time.time() - total_start) * 1000, 1), "reason": "warm_sandbox"}).decode()
 
-        # Check if persistent worker is available, wait if not ready yet
+        # Check if persistent worker is available, wait up to 30 seconds if not ready yet
         t0 = time.time()
-        worker_available = False
-        worker_wait_timeout = 30  # Wait up to 30 seconds for worker to be ready
-
-        while (time.time() - t0) < worker_wait_timeout:
-            worker_check = sb.exec("test", "-f", "/tmp/worker_ready")
-            if worker_check.wait() == 0:
-                worker_available = True
-                break
-            time.sleep(0.3)
+        worker_available = _wait_for_worker(sb, timeout_seconds=30)
 
         timings["worker_check"] = (time.time() - t0) * 1000
-        yield emit_timing("worker_check", timings["worker_check"])
+        if verbose_timings:
+            yield emit_timing("worker_check", timings["worker_check"])
+
+    if not verbose_timings:
+        # One summary of the setup phases instead of an event per phase
+        yield orjson.dumps({"type": "setup_timings", "data": timings}).decode()
 
     if worker_available:
         # Use persistent worker (fast path - imports already loaded)
-        yield json_module.dumps({"type": "timing", "phase": "using_persistent_worker", "duration_ms": 0, "elapsed_ms": round((time.time() - total_start) * 1000, 1)})
+        if verbose_timings:
+            yield orjson.dumps({"type": "timing", "phase": "using_persistent_worker", "duration_ms": 0, "elapsed_ms": round((time.time() - total_start) * 1000, 1)}).decode()
 
-        import uuid
-        request_id = str(uuid.uuid4())
-
-        # Clear any stale output file and write request
+        # Connect to the worker socket through a small client process and send the request
         t0 = time.time()
-        request = json_module.dumps({
-            "request_id": request_id,
+        request = orjson.dumps({
             "app_session_id": session_id,
-            "user_message": user_message
-        })
-        sb.exec("bash", "-c", "rm -f /tmp/worker_output.jsonl && touch /tmp/worker_output.jsonl")
-        with sb.open("/tmp/worker_request.json", "w") as f:
-            f.write(request)
+            "user_message": user_message,
+            "resume_claude_session_id": resume_claude_session_id,
+        }).decode()
+        timeout_seconds = 120  # 2 minute timeout
+        client = sb.exec("python", "-c", WORKER_CLIENT_CODE, bufsize=1, timeout=timeout_seconds)
+        client.stdin.write(request + "\n")
+        client.stdin.write_eof()
+        client.stdin.drain()
         timings["worker_request_write"] = (time.time() - t0) * 1000
-        yield emit_timing("worker_request_write", timings["worker_request_write"])
+        if verbose_timings:
+            yield emit_timing("worker_request_write", timings["worker_request_write"])
 
-        # Poll output file for responses
+        # Stream response lines as the worker writes them
         t0 = time.time()
         first_output = True
-        lines_read = 0
         request_done = False
-        timeout_seconds = 120  # 2 minute timeout
-
-        while not request_done and (time.time() - t0) < timeout_seconds:
-            # Read all new lines from output file
-            result = sb.exec("bash", "-c", f"tail -n +{lines_read + 1} /tmp/worker_output.jsonl 2>/dev/null || true")
-            new_lines = result.stdout.read().strip()
 
-            if new_lines:
-                for line in new_lines.split("\n"):
-                    line = line.strip()
-                    if not line:
-                        continue
+        for line in client.stdout:
+            line = line.strip()
+            if not line:
+                continue
 
-                    lines_read += 1
+            if first_output:
+                timings["time_to_first_output"] = (time.time() - t0) * 1000
+                if verbose_timings:
+                    yield emit_timing("worker_first_output", timings["time_to_first_output"])
+                first_output = False
 
-                    if first_output:
-                        timings["time_to_first_output"] = (time.time() - t0) * 1000
-                        yield emit_timing("worker_first_output", timings["time_to_first_output"])
-                        first_output = False
-
-                    # Check if this is the completion signal
-                    try:
-                        event = json_module.loads(line)
-                        if event.get("type") == "request_done":
-                            request_done = True
-                            continue
-                        if event.get("type") == "worker_processing":
-                            continue  # Internal event, don't forward
-                    except:
-                        pass
+            # Check if this is the completion signal
+            try:
+                event = orjson.loads(line)
+                if event.get("type") == "request_done":
+                    request_done = True
+                    break
+            except:
+                pass
 
-                    yield line
-            else:
-                # No new output, wait a bit
-                time.sleep(0.05)
+            yield line
 
         timings["stream_output"] = (time.time() - t0) * 1000
-        yield emit_timing("stream_output", timings["stream_output"])
+        if verbose_timings:
+            yield emit_timing("stream_output", timings["stream_output"])
 
         if not request_done:
-            yield json_module.dumps({"type": "error", "message": "Worker request timed out"})
+            yield orjson.dumps({"type": "error", "message": "Worker request timed out"}).decode()
 
     else:
         # Fallback disabled - worker must be available
         # If we get here, something is wrong with the worker
-        yield json_module.dumps({
+        yield orjson.dumps({
             "type": "error",
             "message": "Persistent worker not available. Please wait for sandbox to fully initialize or try again."
-        })
-
-    # Commit volume changes
-    t0 = time.time()
-    vol.commit()
-    claude_storage_vol.commit()
-    timings["volume_commit"] = (time.time() - t0) * 1000
-    yield emit_timing("volume_commit", timings["volume_commit"])
+        }).decode()
 
     timings["total"] = (time.time() - total_start) * 1000
 
     # Yield final timing summary
-    yield json_module.dumps({"type": "timings", "data": timings})
+    yield orjson.dumps({"type": "timings", "data": timings}).decode()
+
+    # Commit volume changes in the background, so the stream ends without
+    # waiting on the commit RPCs (the container outlives the call)
+    for volume, label in ((vol, "workspace"), (claude_storage_vol, "claude storage")):
+        threading.Thread(target=_commit_quietly, args=(volume, label)).start()
 
 
 # =============================================================================
@@ -1242,9 +1486,8 @@ def warm_sandbox(account_id: str, session_id: str) -> dict:
 
     The sandbox will:
     1. Create the container if it doesn't exist
-    2. Set up the data directory symlink
-    3. Write all tool files
-    4. Pre-import Python dependencies (optional warm-up)
+    2. Set up the data directory symlink (from the sandbox entrypoint)
+    3. Start the persistent worker, which pre-imports Python dependencies
 
     Returns:
         {
@@ -1254,7 +1497,7 @@ def warm_sandbox(account_id: str, session_id: str) -> dict:
             "message": str
         }
     """
-    sandbox_name = f"agent-{account_id}-{session_id}".replace(".", "-")[:63]
+    sandbox_name = _sandbox_name(account_id, session_id)
     data_dir = f"/workspace/{account_id}/{session_id}"
 
     # Check if sandbox already exists and is running
@@ -1277,6 +1520,7 @@ def warm_sandbox(account_id: str, session_id: str) -> dict:
     # Create new sandbox
     try:
         sb = modal.Sandbox.create(
+            *_sandbox_entrypoint(data_dir),
             app=app,
             image=sandbox_image,
             volumes={
@@ -1297,50 +1541,30 @@ def warm_sandbox(account_id: str, session_id: str) -> dict:
             idle_timeout=20 * 60,  # 20 minute idle timeout
             name=sandbox_name,
         )
-
-        # Create data directory and symlink
-        sb.exec("bash", "-c", f"mkdir -p {data_dir} && rm -rf /data && ln -s {data_dir} /data")
-
-        # Create tools directory
-        sb.exec("bash", "-c", "mkdir -p /tools")
-
-        # Write tool files to the sandbox
-        tool_files = {
-            "/tools/__init__.py": TOOLS_INIT_CODE,
-            "/tools/file_tools.py": FILE_TOOLS_CODE,
-            "/custom_tools.py": CUSTOM_TOOLS_CODE,
+    except modal.exception.AlreadyExistsError:
+        # Another warm-up or chat request created it between our lookup and create
+        return {
+            "success": True,
+            "sandbox_name": sandbox_name,
+            "status": "exists",
+            "message": "Sandbox already running"
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "sandbox_name": sandbox_name,
+            "status": "error",
+            "message": str(e)
         }
 
-        for file_path, content in tool_files.items():
-            if content:
-                with sb.open(file_path, "w") as f:
-                    f.write(content)
-
-        # Write the agent script (fallback for non-worker mode)
-        with sb.open("/agent_entrypoint.py", "w") as f:
-            f.write(AGENT_SCRIPT)
-
-        # Write the persistent worker script
-        with sb.open("/persistent_worker.py", "w") as f:
-            f.write(PERSISTENT_WORKER_SCRIPT)
-
-        # Start persistent worker in background
+    try:
+        # The entrypoint links the data dir and starts the persistent worker
+        # (tools and scripts are baked into the image)
         # This pre-imports all dependencies (~3.7s one-time cost)
         # Worker will signal ready by creating /tmp/worker_ready file
-        import time
-        sb.exec("bash", "-c", "nohup python /persistent_worker.py > /tmp/worker.log 2>&1 &")
 
-        # Wait for worker to be ready (with timeout)
-        worker_ready = False
-        start_time = time.time()
-        timeout_seconds = 30  # Wait up to 30 seconds for imports
-
-        while time.time() - start_time < timeout_seconds:
-            check = sb.exec("test", "-f", "/tmp/worker_ready")
-            if check.wait() == 0:
-                worker_ready = True
-                break
-            time.sleep(0.5)
+        # Wait up to 30 seconds for imports
+        worker_ready = _wait_for_worker(sb, timeout_seconds=30)
 
         return {
             "success": True,
@@ -1366,7 +1590,7 @@ def warm_sandbox(account_id: str, session_id: str) -> dict:
 @app.function(timeout=10)
 def get_sandbox_status(account_id: str, session_id: str) -> dict:
     """Check if sandbox exists, is running, and has worker ready."""
-    sandbox_name = f"agent-{account_id}-{session_id}".replace(".", "-")[:63]
+    sandbox_name = _sandbox_name(account_id, session_id)
 
     try:
         sb = modal.Sandbox.from_name(app_name=app.name, name=sandbox_name)
@@ -1390,7 +1614,7 @@ def get_sandbox_status(account_id: str, session_id: str) -> dict:
 # =============================================================================
 
 @app.function(timeout=30)
-def invalidate_sandbox(account_id: str, session_id: str) -> dict:
+def invalidate_sandbox(account_id: str, session_id: str, rewarm: bool = False) -> dict:
     """
     Terminate an existing sandbox so it gets recreated with fresh volume data.
 
@@ -1398,28 +1622,26 @@ def invalidate_sandbox(account_id: str, session_id: str) -> dict:
     sees the latest files. Modal volumes are snapshotted when a sandbox is
     created, so existing sandboxes don't see new files without recreation.
 
+    With rewarm=True a replacement sandbox is warmed in the background from
+    here, saving the caller a second round-trip.
+
     Returns:
         {"invalidated": bool, "sandbox_name": str, "message": str}
     """
-    sandbox_name = f"agent-{account_id}-{session_id}".replace(".", "-")[:63]
+    sandbox_name = _sandbox_name(account_id, session_id)
 
+    # from_name only finds running sandboxes, and terminating one that has just
+    # exited is a no-op, so there's no separate poll() round-trip first
     try:
         sb = modal.Sandbox.from_name(app_name=app.name, name=sandbox_name)
-        exit_code = sb.poll()
-        if exit_code is None:
-            # Sandbox is running, terminate it
-            sb.terminate()
-            return {
-                "invalidated": True,
-                "sandbox_name": sandbox_name,
-                "message": "Sandbox terminated - will be recreated on next chat message"
-            }
-        else:
-            return {
-                "invalidated": False,
-                "sandbox_name": sandbox_name,
-                "message": "Sandbox already terminated"
-            }
+        sb.terminate()
+        if rewarm:
+            warm_sandbox.spawn(account_id=account_id, session_id=session_id)
+        return {
+            "invalidated": True,
+            "sandbox_name": sandbox_name,
+            "message": "Sandbox terminated - will be recreated on next chat message"
+        }
     except modal.exception.NotFoundError:
         return {
             "invalidated": False,
@@ -1433,33 +1655,17 @@ def interrupt_agent(account_id: str, session_id: str) -> dict:
     """
     Send an interrupt signal to a running agent.
 
-    This writes a signal file to the sandbox that the agent script checks
-    during message iteration. When detected, the agent calls client.interrupt()
-    to stop the current query.
+    This writes to the worker's interrupt FIFO in the sandbox, which wakes
+    the worker during message iteration. The worker then calls
+    client.interrupt() to stop the current query.
 
     Returns:
         {"interrupted": bool, "sandbox_name": str, "message": str}
     """
-    sandbox_name = f"agent-{account_id}-{session_id}".replace(".", "-")[:63]
+    sandbox_name = _sandbox_name(account_id, session_id)
 
     try:
         sb = modal.Sandbox.from_name(app_name=app.name, name=sandbox_name)
-        exit_code = sb.poll()
-        if exit_code is None:
-            # Sandbox is running, write the interrupt signal file
-            with sb.open("/tmp/.interrupt_signal", "w") as f:
-                f.write("interrupt")
-            return {
-                "interrupted": True,
-                "sandbox_name": sandbox_name,
-                "message": "Interrupt signal sent to agent"
-            }
-        else:
-            return {
-                "interrupted": False,
-                "sandbox_name": sandbox_name,
-                "message": "Sandbox not running"
-            }
     except modal.exception.NotFoundError:
         return {
             "interrupted": False,
@@ -1467,16 +1673,32 @@ def interrupt_agent(account_id: str, session_id: str) -> dict:
             "message": "No sandbox found"
         }
 
-
-@app.function(volumes={VOL_MOUNT_PATH: vol}, timeout=60)
-def save_file(account_id: str, session_id: str, filename: str, content: bytes) -> dict:
-    """Save a file to the session directory."""
-    session_dir = VOL_MOUNT_PATH / account_id / session_id
-    session_dir.mkdir(parents=True, exist_ok=True)
-    file_path = session_dir / filename
-    file_path.write_bytes(content)
-    vol.commit()
-    return {"filename": filename, "size": len(content), "path": str(file_path)}
+    # Poke the worker's interrupt FIFO straight away; if the sandbox has stopped,
+    # the exec fails, so there's no separate poll() round-trip first.
+    # The -p check keeps a write before the worker's mkfifo from creating a plain
+    # file, and the timeout guards against a FIFO with no worker reading it.
+    try:
+        exit_code = sb.exec(
+            "bash", "-c",
+            "[ -p /tmp/interrupt.fifo ] && timeout 2 bash -c 'echo 1 > /tmp/interrupt.fifo'",
+        ).wait()
+    except modal.exception.Error:
+        return {
+            "interrupted": False,
+            "sandbox_name": sandbox_name,
+            "message": "Sandbox not running"
+        }
+    if exit_code != 0:
+        return {
+            "interrupted": False,
+            "sandbox_name": sandbox_name,
+            "message": "Agent not listening for interrupts"
+        }
+    return {
+        "interrupted": True,
+        "sandbox_name": sandbox_name,
+        "message": "Interrupt signal sent to agent"
+    }
 
 
 @app.function(volumes={VOL_MOUNT_PATH: vol}, timeout=60)
@@ -1499,22 +1721,9 @@ def delete_file(account_id: str, session_id: str, filename: str) -> dict:
     return {"deleted": False, "error": "File not found"}
 
 
-@app.function(volumes={VOL_MOUNT_PATH: vol}, timeout=60)
-def get_file_content(account_id: str, session_id: str, filename: str) -> dict:
-    """Get file content from the session directory."""
-    file_path = VOL_MOUNT_PATH / account_id / session_id / filename
-    if not file_path.exists():
-        return {"error": "File not found", "content": None}
-
-    content = file_path.read_bytes()
-    return {"filename": filename, "content": content, "size": len(content)}
-
-
 @app.function(volumes={CLAUDE_STORAGE_PATH: claude_storage_vol}, timeout=60)
 def debug_claude_storage() -> dict:
     """Debug function to explore the Claude SDK storage structure."""
-    import os
-
     result = {
         "base_path": str(CLAUDE_STORAGE_PATH),
         "exists": CLAUDE_STORAGE_PATH.exists(),
@@ -1538,7 +1747,7 @@ def debug_claude_storage() -> dict:
     return result
 
 
-@app.function(volumes={CLAUDE_STORAGE_PATH: claude_storage_vol}, timeout=60)
+@app.function(image=wrapper_image, volumes={CLAUDE_STORAGE_PATH: claude_storage_vol}, timeout=60)
 def get_session_messages(app_session_id: str) -> dict:
     """
     Get the conversation messages for a session from Claude SDK storage.
@@ -1553,10 +1762,10 @@ def get_session_messages(app_session_id: str) -> dict:
             ]
         }
     """
-    import json
-    import os
     from datetime import datetime
 
+    import orjson
+
     # First, get the Claude session ID from our mapping
     session_file = CLAUDE_STORAGE_PATH / "sessions" / f"{app_session_id}.txt"
 
@@ -1566,33 +1775,58 @@ def get_session_messages(app_session_id: str) -> dict:
     claude_session_id = session_file.read_text().strip()
 
     # Find the JSONL file for this session
-    # Claude SDK stores them in: ~/.claude/projects/{project_hash}/{session_id}.jsonl
-    jsonl_file = None
-    for root, dirs, files in os.walk(CLAUDE_STORAGE_PATH / "projects"):
-        for f in files:
-            if f == f"{claude_session_id}.jsonl":
-                jsonl_file = Path(root) / f
-                break
-        if jsonl_file:
-            break
-
-    if not jsonl_file or not jsonl_file.exists():
+    # Claude SDK stores them in: ~/.claude/projects/{project_dir}/{session_id}.jsonl,
+    # where project_dir is the agent's cwd with "/" replaced by "-". The agent runs
+    # in /data, so try that directly before searching the project dirs.
+    projects_dir = CLAUDE_STORAGE_PATH / "projects"
+    jsonl_file = projects_dir / "-data" / f"{claude_session_id}.jsonl"
+    if not jsonl_file.exists():
+        jsonl_file = next(projects_dir.glob(f"*/{claude_session_id}.jsonl"), None)
+
+    if not jsonl_file:
         return {"messages": [], "error": "Session JSONL not found"}
 
+    # Longest text returned per message; a history view only needs the start
+    # of a huge message, and this keeps the response size bounded
+    text_limit = 64 * 1024
+
+    def join_capped(parts, sep: str) -> str:
+        """Join text parts, stopping once text_limit characters are reached."""
+        kept = []
+        size = 0
+        for part in parts:
+            if kept:
+                size += len(sep)
+            if size + len(part) > text_limit:
+                kept.append(part[:max(text_limit - size, 0)])
+                return sep.join(kept) + "…[truncated]"
+            kept.append(part)
+            size += len(part)
+        return sep.join(kept)
+
     # Parse the JSONL file to extract messages
     messages = []
     message_counter = 0
 
     try:
-        with open(jsonl_file, 'r') as fp:
-            for line in fp:
-                line = line.strip()
-                if not line:
+        with open(jsonl_file, 'rb') as fp:
+            # Read the whole file and split it in one C call rather than iterating
+            # the file object line by line; only huge files are streamed, to keep
+            # memory bounded
+            if os.fstat(fp.fileno()).st_size <= 100 * 1024 * 1024:
+                lines = fp.read().split(b"\n")
+            else:
+                lines = fp
+            for line in lines:
+                # Only user and assistant entries are kept; a line that names neither
+                # can't be one, so skip it without parsing
+                if b'"user"' not in line and b'"assistant"' not in line:
                     continue
+                line = line.strip()
 
                 try:
-                    entry = json.loads(line)
-                except json.JSONDecodeError:
+                    entry = orjson.loads(line)
+                except orjson.JSONDecodeError:
                     continue
 
                 entry_type = entry.get("type")
@@ -1605,11 +1839,16 @@ def get_session_messages(app_session_id: str) -> dict:
 
                     # Content can be string or list of content blocks
                     if isinstance(content, list):
-                        text_parts = []
-                        for block in content:
-                            if isinstance(block, dict) and block.get("type") == "text":
-                                text_parts.append(block.get("text", ""))
-                        content = "\n".join(text_parts)
+                        content = join_capped(
+                            (
+                                block["text"] for block in content
+                                if isinstance(block, dict) and block.get("type") == "text"
+                                and isinstance(block.get("text"), str)
+                            ),
+                            "\n",
+                        )
+                    elif isinstance(content, str):
+                        content = join_capped((content,), "")
 
                     messages.append({
                         "id": f"user-{message_counter}",
@@ -1627,6 +1866,8 @@ def get_session_messages(app_session_id: str) -> dict:
                     # Build text content and structured content blocks
                     text_parts = []
                     structured_blocks = []
+                    # This message's tool calls by ID, for matching tool results
+                    tool_calls_by_id = {}
 
                     for block in content_blocks:
                         if not isinstance(block, dict):
@@ -1636,6 +1877,9 @@ def get_session_messages(app_session_id: str) -> dict:
 
                         if block_type == "text":
                             text = block.get("text", "")
+                            if not isinstance(text, str):
+                                continue
+                            text = join_capped((text,), "")
                             text_parts.append(text)
                             structured_blocks.append({
                                 "type": "text",
@@ -1649,6 +1893,7 @@ def get_session_messages(app_session_id: str) -> dict:
                                 "input": block.get("input", {}),
                                 "status": "completed",  # Historical messages are complete
                             }
+                            tool_calls_by_id[tool_call["id"]] = tool_call
                             structured_blocks.append({
                                 "type": "tool_call",
                                 "toolCall": tool_call
@@ -1667,16 +1912,16 @@ def get_session_messages(app_session_id: str) -> dict:
                                         result_text_parts.append(item.get("text", ""))
                                 result_content = "\n".join(result_text_parts)
 
-                            # Update the corresponding tool call in structured_blocks
-                            for sb in structured_blocks:
-                                if sb.get("type") == "tool_call" and sb.get("toolCall", {}).get("id") == tool_use_id:
-                                    sb["toolCall"]["result"] = result_content[:500] if len(str(result_content)) > 500 else result_content
-                                    sb["toolCall"]["status"] = "completed"
+                            # Update the corresponding tool call
+                            tool_call = tool_calls_by_id.get(tool_use_id)
+                            if tool_call is not None:
+                                tool_call["result"] = result_content[:500] if len(str(result_content)) > 500 else result_content
+                                tool_call["status"] = "completed"
 
                     messages.append({
                         "id": f"assistant-{message_counter}",
                         "role": "assistant",
-                        "content": "\n\n".join(text_parts),
+                        "content": join_capped(text_parts, "\n\n"),
                         "timestamp": entry.get("timestamp", datetime.now().isoformat()),
                         "contentBlocks": structured_blocks if structured_blocks else None,
                     })
@@ -1688,7 +1933,7 @@ def get_session_messages(app_session_id: str) -> dict:
 
 
 @app.function(volumes={VOL_MOUNT_PATH: vol, CLAUDE_STORAGE_PATH: claude_storage_vol}, timeout=60)
-def cleanup_session(account_id: str, session_id: str) -> dict:
+async def cleanup_session(account_id: str, session_id: str) -> dict:
     """
     Clean up all data for a session.
 
@@ -1705,6 +1950,9 @@ def cleanup_session(account_id: str, session_id: str) -> dict:
             "sandbox_terminated": bool
         }
     """
+    import asyncio
+    import shutil
+
     result = {
         "success": True,
         "files_deleted": 0,
@@ -1712,30 +1960,45 @@ def cleanup_session(account_id: str, session_id: str) -> dict:
         "sandbox_terminated": False
     }
 
+    # The three steps are independent, so they run concurrently
+
     # 1. Delete user files
-    session_dir = VOL_MOUNT_PATH / account_id / session_id
-    if session_dir.exists():
-        import shutil
-        file_count = sum(1 for _ in session_dir.iterdir() if _.is_file())
-        shutil.rmtree(session_dir)
-        result["files_deleted"] = file_count
-        vol.commit()
+    async def delete_user_files():
+        session_dir = VOL_MOUNT_PATH / account_id / session_id
+        if session_dir.exists():
+            # scandir reports the entry type from the directory listing, no stat per file
+            with os.scandir(session_dir) as entries:
+                file_count = sum(1 for entry in entries if entry.is_file(follow_symlinks=False))
+            await asyncio.to_thread(shutil.rmtree, session_dir)
+            result["files_deleted"] = file_count
+            await vol.commit.aio()
 
     # 2. Delete Claude session state
-    session_file = CLAUDE_STORAGE_PATH / "sessions" / f"{session_id}.txt"
-    if session_file.exists():
-        session_file.unlink()
-        result["session_state_deleted"] = True
-        claude_storage_vol.commit()
+    async def delete_session_state():
+        session_file = CLAUDE_STORAGE_PATH / "sessions" / f"{session_id}.txt"
+        if session_file.exists():
+            session_file.unlink()
+            result["session_state_deleted"] = True
+            await claude_storage_vol.commit.aio()
 
     # 3. Try to terminate sandbox
-    sandbox_name = f"agent-{account_id}-{session_id}".replace(".", "-")[:63]
-    try:
-        sb = modal.Sandbox.from_name(app_name=app.name, name=sandbox_name)
-        if sb.poll() is None:
-            sb.terminate()
-            result["sandbox_terminated"] = True
-    except modal.exception.NotFoundError:
-        pass
+    async def terminate_sandbox():
+        sandbox_name = _sandbox_name(account_id, session_id)
+        try:
+            sb = await modal.Sandbox.from_name.aio(app_name=app.name, name=sandbox_name)
+            if await sb.poll.aio() is None:
+                await sb.terminate.aio()
+                result["sandbox_terminated"] = True
+        except modal.exception.NotFoundError:
+            pass
+
+    # A failing step doesn't stop the others; its error is raised once they finish
+    outcomes = await asyncio.gather(
+        delete_user_files(), delete_session_state(), terminate_sandbox(),
+        return_exceptions=True,
+    )
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            raise outcome
 
     return result
@@ -11,11 +11,16 @@ This prevents prompt injection attacks from extracting the API key, since
 the sandbox never has access to it.
 """
 
+import asyncio
 import os
+import time
 
 import modal
 
-proxy_image = modal.Image.debian_slim(python_version="3.12").pip_install("httpx", "fastapi")
+# How long a sandbox ID stays trusted after a successful validation
+SANDBOX_VALIDATION_TTL = 10.0
+
+proxy_image = modal.Image.debian_slim(python_version="3.12").pip_install("httpx[http2]", "fastapi")
 
 anthropic_secret = modal.Secret.from_name("anthropic-api-key")
 
@@ -26,10 +31,52 @@ app = modal.App("claude-agent-modal-box-proxy")
 @modal.concurrent(max_inputs=100)
 @modal.asgi_app()
 def anthropic_proxy():
+    from contextlib import asynccontextmanager
+
     import httpx
-    from fastapi import FastAPI, HTTPException, Request, Response
+    from fastapi import FastAPI, HTTPException, Request
+    from fastapi.responses import StreamingResponse
+    from starlette.background import BackgroundTask
+
+    # One pooled HTTP/2 client for the container's lifetime, so requests reuse
+    # warm connections to Anthropic instead of a TCP + TLS handshake each
+    client = httpx.AsyncClient(
+        base_url="https://api.anthropic.com",
+        http2=True,
+        timeout=300.0,
+        limits=httpx.Limits(max_keepalive_connections=100, max_connections=500),
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        await client.aclose()
+
+    proxy_app = FastAPI(lifespan=lifespan)
+
+    # Sandbox ID -> monotonic time its validation expires, so a chatty sandbox
+    # skips the control-plane lookup on most requests
+    validated_until: dict[str, float] = {}
+    # Lookups in flight, shared by concurrent requests from the same sandbox
+    pending_validations: dict[str, asyncio.Task] = {}
+
+    async def validate_sandbox(sandbox_id: str):
+        """Check the sandbox exists and is still running; raises HTTPException if not."""
+        try:
+            sb = await modal.Sandbox.from_id.aio(sandbox_id)
+        except Exception as e:
+            # Handle sandbox not found or any other validation error
+            if "NotFound" in type(e).__name__ or "not found" in str(e).lower():
+                raise HTTPException(status_code=403, detail="Invalid sandbox ID")
+            raise HTTPException(status_code=403, detail=f"Sandbox validation failed: {str(e)}")
+        if sb.returncode is not None:
+            raise HTTPException(status_code=403, detail="Sandbox no longer running")
 
-    proxy_app = FastAPI()
+        now = time.monotonic()
+        if len(validated_until) > 10_000:
+            for key in [k for k, expiry in validated_until.items() if expiry <= now]:
+                del validated_until[key]
+        validated_until[sandbox_id] = now + SANDBOX_VALIDATION_TTL
 
     @proxy_app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS", "HEAD"])
     async def proxy(request: Request, path: str):
@@ -42,34 +89,45 @@ def anthropic_proxy():
         if not sandbox_id:
             raise HTTPException(status_code=401, detail="Missing x-api-key header")
 
-        # Validate the sandbox exists and is still running
-        try:
-            sb = await modal.Sandbox.from_id.aio(sandbox_id)
-            if sb.returncode is not None:
-                raise HTTPException(status_code=403, detail="Sandbox no longer running")
-        except Exception as e:
-            # Handle sandbox not found or any other validation error
-            if "NotFound" in type(e).__name__ or "not found" in str(e).lower():
-                raise HTTPException(status_code=403, detail="Invalid sandbox ID")
-            raise HTTPException(status_code=403, detail=f"Sandbox validation failed: {str(e)}")
+        # Validate the sandbox exists and is still running, unless it did recently
+        if validated_until.get(sandbox_id, 0.0) <= time.monotonic():
+            task = pending_validations.get(sandbox_id)
+            if task is None:
+                task = asyncio.ensure_future(validate_sandbox(sandbox_id))
+                pending_validations[sandbox_id] = task
+                task.add_done_callback(lambda _: pending_validations.pop(sandbox_id, None))
+            # Shielded so one disconnecting client doesn't cancel it for the others
+            await asyncio.shield(task)
 
         # Swap the sandbox ID for the real API key
         headers["x-api-key"] = os.environ["ANTHROPIC_API_KEY"]
 
         # Forward the request to Anthropic's API
-        async with httpx.AsyncClient() as client:
-            resp = await client.request(
-                method=request.method,
-                url=f"https://api.anthropic.com/{path}",
-                headers=headers,
-                content=await request.body(),
-                timeout=300.0,
-            )
-
-        return Response(
-            content=resp.content,
+        # Stream the response back as it arrives, so SSE completions reach the
+        # sandbox token by token instead of after the whole body is buffered
+        upstream_request = client.build_request(
+            method=request.method,
+            url=f"/{path}",
+            headers=headers,
+            content=await request.body(),
+        )
+        resp = await client.send(upstream_request, stream=True)
+        if resp.status_code in (401, 403):
+            # Don't keep trusting a sandbox whose requests are being refused
+            validated_until.pop(sandbox_id, None)
+
+        # Bytes are passed through undecoded, so content-encoding stays valid;
+        # the framing headers are set by the response itself
+        response_headers = {
+            k: v for k, v in resp.headers.items()
+            if k.lower() not in ("content-length", "transfer-encoding", "connection")
+        }
+        return StreamingResponse(
+            resp.aiter_raw(),
             status_code=resp.status_code,
-            media_type="application/json"
+            headers=response_headers,
+            media_type=resp.headers.get("content-type"),
+            background=BackgroundTask(resp.aclose),
         )
 
     return proxy_app
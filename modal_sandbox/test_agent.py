@@ -10,6 +10,12 @@ import uuid
 
 def parse_events(event_json):
     """Parse potentially multiple JSON objects from a string."""
+    # run_agent_streaming yields one object per chunk, so that case skips the split
+    if "\n" not in event_json.strip():
+        try:
+            return [json.loads(event_json)]
+        except json.JSONDecodeError:
+            return []
     events = []
     for line in event_json.strip().split('\n'):
         if not line.strip():
@@ -33,7 +39,7 @@ def test_agent():
 
     # Test message 1
     print("\n--- Message 1: 'Hello, what is 2+2?' ---")
-    response_text_1 = ""
+    response_chunks_1: list[str] = []
     event_count_1 = 0
 
     try:
@@ -49,7 +55,7 @@ def test_agent():
 
                 if event_type == "text":
                     content = event.get("content", "")
-                    response_text_1 += content
+                    response_chunks_1.append(content)
                     print(f" - {content[:50]}..." if len(content) > 50 else f" - {content}")
                 elif event_type == "tool_use":
                     print(f" - Tool: {event.get('tool')}")
@@ -72,6 +78,7 @@ def test_agent():
         traceback.print_exc()
         return False
 
+    response_text_1 = "".join(response_chunks_1)
     print(f"\nMessage 1 complete. Events: {event_count_1}, Response length: {len(response_text_1)}")
 
     if not response_text_1:
@@ -80,7 +87,7 @@ def test_agent():
 
     # Test message 2 (should continue conversation)
     print("\n--- Message 2: 'What did I just ask you?' ---")
-    response_text_2 = ""
+    response_chunks_2: list[str] = []
     event_count_2 = 0
 
     try:
@@ -96,7 +103,7 @@ def test_agent():
 
                 if event_type == "text":
                     content = event.get("content", "")
-                    response_text_2 += content
+                    response_chunks_2.append(content)
                     print(f" - {content[:50]}..." if len(content) > 50 else f" - {content}")
                 elif event_type == "result":
                     print(f" - Duration: {event.get('duration_ms')}ms, Turns: {event.get('num_turns')}")
@@ -115,6 +122,7 @@ def test_agent():
         traceback.print_exc()
         return False
 
+    response_text_2 = "".join(response_chunks_2)
     print(f"\nMessage 2 complete. Events: {event_count_2}, Response length: {len(response_text_2)}")
 
     if not response_text_2:
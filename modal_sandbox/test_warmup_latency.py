@@ -10,12 +10,73 @@ This test simulates the frontend flow:
 This helps answer: "If I wait for 'Sandbox Active', will my first message be fast?"
 """
 
+import functools
 import json
 import time
 import uuid
+from typing import Optional
 
 import modal
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+
+@functools.lru_cache(maxsize=None)
+def _get_function(name: str) -> modal.Function:
+    """Look up a deployed function once per process, not once per test."""
+    return modal.Function.from_name("claude-agent-modal-box", name)
+
+
+# Only these events are read here; other lines are skipped without parsing
+_TIMING_TAG = '"type":"timing"'
+_RESULT_TAG = '"type":"result"'
+
+
+def _consume_timings(events, verbose: bool = True) -> tuple[dict, Optional[float]]:
+    """
+    Drain a run_agent_streaming generator, collecting worker-related timings.
+
+    Returns:
+        (worker_info, sdk_duration_ms): worker/python phase durations plus a
+        "mode" entry, and the SDK duration from the result event
+    """
+    worker_info = {}
+    sdk_duration = None
+
+    for event_json in events:
+        for line in event_json.splitlines():
+            if _TIMING_TAG not in line and _RESULT_TAG not in line:
+                continue
+            try:
+                event = json_loads(line)
+            except json.JSONDecodeError:
+                continue
+            event_type = event.get('type')
+
+            if event_type == 'timing':
+                phase = event.get('phase', '')
+                duration = event.get('duration_ms', 0)
+
+                # Track worker-related timings
+                if 'worker' in phase or 'python' in phase or 'fallback' in phase.lower():
+                    worker_info[phase] = duration
+                    if verbose:
+                        print(f"  {phase}: {duration:.0f}ms")
+
+                # Track if we're using worker or fallback
+                if phase == 'using_persistent_worker':
+                    worker_info['mode'] = 'persistent_worker'
+                elif phase == 'using_process_fallback':
+                    worker_info['mode'] = 'process_fallback'
+
+            elif event_type == 'result':
+                sdk_duration = event.get('duration_ms')
+
+    return worker_info, sdk_duration
+
 
 def test_warmup_then_message():
     """Test latency when sending message immediately after warm_sandbox completes."""
@@ -25,8 +86,8 @@ def test_warmup_then_message():
     print("=" * 70)
 
     # Get Modal functions
-    warm_sandbox = modal.Function.from_name("claude-agent-modal-box", "warm_sandbox")
-    run_agent_streaming = modal.Function.from_name("claude-agent-modal-box", "run_agent_streaming")
+    warm_sandbox = _get_function("warm_sandbox")
+    run_agent_streaming = _get_function("run_agent_streaming")
 
     session_id = f"warmup-test-{uuid.uuid4().hex[:8]}"
     account_id = "latency-test"
@@ -54,41 +115,12 @@ def test_warmup_then_message():
 
     request_start = time.time()
 
-    worker_info = {}
-    sdk_duration = None
-
-    for event_json in run_agent_streaming.remote_gen(
+    worker_info, sdk_duration = _consume_timings(run_agent_streaming.remote_gen(
         session_id=session_id,
         account_id=account_id,
-        user_message="Say 'hello' in one word."
-    ):
-        for line in event_json.strip().split('\n'):
-            if not line:
-                continue
-            try:
-                event = json.loads(line)
-                event_type = event.get('type')
-
-                if event_type == 'timing':
-                    phase = event.get('phase', '')
-                    duration = event.get('duration_ms', 0)
-
-                    # Track worker-related timings
-                    if 'worker' in phase or 'python' in phase or 'fallback' in phase.lower():
-                        worker_info[phase] = duration
-                        print(f"  {phase}: {duration:.0f}ms")
-
-                    # Track if we're using worker or fallback
-                    if phase == 'using_persistent_worker':
-                        worker_info['mode'] = 'persistent_worker'
-                    elif phase == 'using_process_fallback':
-                        worker_info['mode'] = 'process_fallback'
-
-                elif event_type == 'result':
-                    sdk_duration = event.get('duration_ms')
-
-            except json.JSONDecodeError:
-                pass
+        user_message="Say 'hello' in one word.",
+        verbose_timings=True,
+    ))
 
     request_duration = (time.time() - request_start) * 1000
 
@@ -105,39 +137,12 @@ def test_warmup_then_message():
 
     request2_start = time.time()
 
-    worker_info2 = {}
-    sdk_duration2 = None
-
-    for event_json in run_agent_streaming.remote_gen(
+    worker_info2, sdk_duration2 = _consume_timings(run_agent_streaming.remote_gen(
         session_id=session_id,
         account_id=account_id,
-        user_message="Say 'world' in one word."
-    ):
-        for line in event_json.strip().split('\n'):
-            if not line:
-                continue
-            try:
-                event = json.loads(line)
-                event_type = event.get('type')
-
-                if event_type == 'timing':
-                    phase = event.get('phase', '')
-                    duration = event.get('duration_ms', 0)
-
-                    if 'worker' in phase or 'python' in phase:
-                        worker_info2[phase] = duration
-                        print(f"  {phase}: {duration:.0f}ms")
-
-                    if phase == 'using_persistent_worker':
-                        worker_info2['mode'] = 'persistent_worker'
-                    elif phase == 'using_process_fallback':
-                        worker_info2['mode'] = 'process_fallback'
-
-                elif event_type == 'result':
-                    sdk_duration2 = event.get('duration_ms')
-
-            except json.JSONDecodeError:
-                pass
+        user_message="Say 'world' in one word.",
+        verbose_timings=True,
+    ))
 
     request2_duration = (time.time() - request2_start) * 1000
 
@@ -194,8 +199,8 @@ def test_delay_after_warmup():
     print("DELAYED MESSAGE TEST (5s wait after warmup)")
     print("=" * 70)
 
-    warm_sandbox = modal.Function.from_name("claude-agent-modal-box", "warm_sandbox")
-    run_agent_streaming = modal.Function.from_name("claude-agent-modal-box", "run_agent_streaming")
+    warm_sandbox = _get_function("warm_sandbox")
+    run_agent_streaming = _get_function("run_agent_streaming")
 
     session_id = f"delay-test-{uuid.uuid4().hex[:8]}"
     account_id = "latency-test"
@@ -216,26 +221,13 @@ def test_delay_after_warmup():
     # Send message
     print("\nSending message...")
     request_start = time.time()
-    mode = None
-
-    for event_json in run_agent_streaming.remote_gen(
+    worker_info, _ = _consume_timings(run_agent_streaming.remote_gen(
         session_id=session_id,
         account_id=account_id,
-        user_message="Say 'test' in one word."
-    ):
-        for line in event_json.strip().split('\n'):
-            if not line:
-                continue
-            try:
-                event = json.loads(line)
-                if event.get('type') == 'timing':
-                    phase = event.get('phase', '')
-                    if phase == 'using_persistent_worker':
-                        mode = 'persistent_worker'
-                    elif phase == 'using_process_fallback':
-                        mode = 'process_fallback'
-            except:
-                pass
+        user_message="Say 'test' in one word.",
+        verbose_timings=True,
+    ), verbose=False)
+    mode = worker_info.get('mode')
 
     request_duration = (time.time() - request_start) * 1000
     print(f"  Request: {request_duration:.0f}ms, mode={mode}")